@@ -0,0 +1,208 @@
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import platform
+import tempfile
+import threading
+import tracemalloc
+import fireman as FRM
+from datetime import datetime
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+SIZE_DISTRIBUTIONS = ("fixed", "uniform", "lognormal")
+
+
+def file_size(rnd: random.Random, distribution: str, mean_size: int) -> int:
+    if distribution == "fixed":
+        return mean_size
+    if distribution == "uniform":
+        return rnd.randint(0, 2 * mean_size)
+    # lognormal: mostly small files with a long tail of big ones, like real trees
+    return int(rnd.lognormvariate(0, 1.5) * mean_size / 3.08)
+
+
+def generate_tree(root: str, depth: int, fanout: int, files_per_folder: int, empty_folders: int,
+                  distribution: str, mean_size: int, seed: int) -> dict:
+    rnd = random.Random(seed)
+    files = folders = total_bytes = 0
+
+    def _generate(folder, level):
+        nonlocal files, folders, total_bytes
+        for i in range(files_per_folder):
+            size = file_size(rnd, distribution, mean_size)
+            with open(os.path.join(folder, f"file_{level}_{i}.dat"), "wb") as f:
+                f.write(rnd.randbytes(size) if size else b"")
+            files += 1
+            total_bytes += size
+
+        if level < depth:
+            for i in range(fanout):
+                sub_folder = os.path.join(folder, f"dir_{level}_{i}")
+                os.mkdir(sub_folder)
+                folders += 1
+                _generate(sub_folder, level + 1)
+
+    _generate(root, 0)
+
+    for i in range(empty_folders):
+        os.makedirs(os.path.join(root, f"empty_{i}", "sub"))
+        folders += 2
+
+    return {"files": files, "folders": folders, "bytes": total_bytes}
+
+
+def max_rss() -> int:
+    # peak resident set size of the process so far, in bytes (ru_maxrss is in KB on linux, bytes on macOS)
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+def arrow_peak(func: callable, interval: float = 0.001) -> int:
+    """
+    Run func, returning the peak of pa.total_allocated_bytes() above its value at the start (sampled every
+    interval seconds): the arrow buffers tracemalloc doesn't see (arrow backed strings, IPC batches, ...)
+    """
+    start = peak = FRM.pa.total_allocated_bytes()
+    done = threading.Event()
+
+    def _sample():
+        nonlocal peak
+        while not done.wait(interval):
+            peak = max(peak, FRM.pa.total_allocated_bytes())
+
+    sampler = threading.Thread(target=_sample, daemon=True)
+    sampler.start()
+    try:
+        func()
+    finally:
+        done.set()
+        sampler.join()
+    return max(peak, FRM.pa.total_allocated_bytes()) - start
+
+
+def measure(phase: str, func: callable, items: int, total_bytes: int = 0, repeat: int = 1, trace_memory: bool = True, setup: callable = None) -> dict:
+    """
+    func(context) is timed 'repeat' times (best is kept), then run once more under tracemalloc for the peak memory,
+    with the peak of the arrow allocations (when pyarrow is installed) and the process peak RSS after it alongside:
+    tracemalloc only sees the python allocations.
+    setup() is called before every run (not timed), and its result is passed to func.
+    """
+    best = None
+    for _ in range(repeat):
+        context = setup() if setup else None
+        start = time.perf_counter()
+        func(context)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    peak = arrow = rss = None
+    if trace_memory:
+        context = setup() if setup else None
+        tracemalloc.start()
+        if FRM.pa is not None:
+            arrow = arrow_peak(lambda: func(context))
+        else:
+            func(context)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        rss = max_rss()
+
+    result = {
+        "phase": phase,
+        "items": items,
+        "seconds": round(best, 6),
+        "items_per_sec": round(items / best, 1) if best else None,
+        "peak_memory_mb": round(peak / 2**20, 3) if peak is not None else None,
+        "arrow_peak_mb": round(arrow / 2**20, 3) if arrow is not None else None,
+        "max_rss_mb": round(rss / 2**20, 1) if rss is not None else None,
+    }
+    if total_bytes:
+        result["mb_per_sec"] = round(total_bytes / 2**20 / best, 1) if best else None
+
+    print(f"{phase:<30} {best:>10.4f}s {result['items_per_sec'] or 0:>14,.0f} items/s", file=sys.stderr)
+    return result
+
+
+def run(args) -> dict:
+    workdir = tempfile.mkdtemp(prefix="fireman_bench_", dir=args.tmp_dir)
+    src = os.path.join(workdir, "src")
+    os.mkdir(src)
+
+    try:
+        tree = generate_tree(src, args.depth, args.fanout, args.files, args.empty_folders, args.size_distribution, args.mean_size, args.seed)
+        print(f"tree: {tree['files']} files, {tree['folders']} folders, {tree['bytes'] / 2**20:.1f} MB in {src}", file=sys.stderr)
+
+        files = FRM.list_files(src, include_full_path_name=True, include_folders=False, include_sub_folders=True)
+        frm = FRM.FiReMan().scan_folder(src, workers=args.workers)
+        mem = args.memory
+        results = list()
+        destinations = iter(range(1_000_000))
+
+        def _new_destination(_=None):
+            return os.path.join(workdir, f"dst_{next(destinations)}")
+
+        def _planned(_=None):
+            return FRM.FiReMan().scan_folder(src).generate_output(_new_destination(), keep_source_folder_structure=True, src_regex=r"^file_(.+)$", dst_regex=r"copy_\1")
+
+        results.append(measure("list_files", lambda _: FRM.list_files(src, include_full_path_name=True, include_folders=False, include_sub_folders=True), tree["files"], repeat=args.repeat, trace_memory=mem))
+        results.append(measure("list_file_details", lambda _: FRM.list_file_details(files, src), tree["files"], repeat=args.repeat, trace_memory=mem))
+        results.append(measure("scan_file_details", lambda _: FRM.scan_file_details(src, include_folders=False, include_sub_folders=True, workers=args.workers), tree["files"], repeat=args.repeat, trace_memory=mem))
+        results.append(measure("list_empty_folders", lambda _: FRM.list_empty_folders(src, workers=args.workers), tree["folders"], repeat=args.repeat, trace_memory=mem))
+        results.append(measure("FiReMan.scan_folder", lambda _: FRM.FiReMan().scan_folder(src, workers=args.workers).df, tree["files"], repeat=args.repeat, trace_memory=mem))
+        results.append(measure("FiReMan.generate_output", lambda _: frm.generate_output(workdir, keep_source_folder_structure=True, src_regex=r"^file_(.+)$", dst_regex=r"copy_\1"), tree["files"], repeat=args.repeat, trace_memory=mem))
+        results.append(measure("FiReMan.execute(dryrun)", lambda f: f.execute(FRM.ACTION_COPY, is_dryrun=True), tree["files"], repeat=args.repeat, trace_memory=mem, setup=_planned))
+        results.append(measure("FiReMan.execute(COPY)", lambda f: f.execute(FRM.ACTION_COPY, is_dryrun=False, workers=args.workers), tree["files"], tree["bytes"], repeat=args.repeat, trace_memory=mem, setup=_planned))
+
+        return {
+            "meta": {
+                "timestamp": datetime.now().isoformat(timespec="seconds"),
+                "python": platform.python_version(),
+                "pandas": FRM.pd.__version__,
+                "platform": platform.platform(),
+                "params": {k: v for k, v in vars(args).items() if k not in ("output", "tmp_dir")},
+                "tree": tree,
+            },
+            "results": results,
+        }
+    finally:
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+def parse_args(argv: list = None):
+    parser = argparse.ArgumentParser(description="Benchmark FiReMan scan, plan and execute phases on a synthetic tree")
+    parser.add_argument("--depth", type=int, default=3, help="folder levels below the root")
+    parser.add_argument("--fanout", type=int, default=6, help="sub-folders per folder")
+    parser.add_argument("--files", type=int, default=20, help="files per folder")
+    parser.add_argument("--empty-folders", type=int, default=50, help="empty folder pairs created at the root")
+    parser.add_argument("--size-distribution", choices=SIZE_DISTRIBUTIONS, default="lognormal")
+    parser.add_argument("--mean-size", type=int, default=4096, help="mean file size in bytes")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per phase, the best is reported")
+    parser.add_argument("--workers", type=int, default=0, help="workers= passed to scan/execute")
+    parser.add_argument("--no-memory", dest="memory", action="store_false", help="skip the tracemalloc peak memory run")
+    parser.add_argument("--tmp-dir", default=None, help="where to create the synthetic tree (default: system temp)")
+    parser.add_argument("--keep", action="store_true", help="do not delete the synthetic tree")
+    parser.add_argument("--output", default="", help="JSON file to write (default: stdout)")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    report = run(args)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
@@ -1,20 +1,89 @@
 import os
-from dearpygui.core import add_same_line, add_text, show_logger, add_button, add_label_text, start_dearpygui, select_directory_dialog, log_debug, set_value, add_table, set_table_data
+import queue
+import threading
+from dearpygui.core import add_same_line, add_text, show_logger, add_button, add_label_text, start_dearpygui, select_directory_dialog, log_debug, set_value, add_table, set_table_data, add_input_text, add_combo, get_value, set_render_callback
 from dearpygui.simple import window
 import fireman
 
+PAGE_SIZE = 100
+BATCH_SIZE = 5000
+SCAN_ORDER = "(scan order)"
+
+view = fireman.TableView()
+pending = queue.Queue()
+scan_id = 0
+page = 0
+
+
 def directory_picker(sender, data):
     select_directory_dialog(callback=apply_selected_directory)
 
 def apply_selected_directory(sender, data):
+    global scan_id, page
     log_debug(data)  # so we can see what is inside of data
     folder = os.path.join(data[0], data[1]).rstrip(".").rstrip(os.sep) + os.sep
 
     set_value("folder", folder)
 
-    res = fireman.list_files(folder, include_full_path_name=True, include_folders=False, include_sub_folders=True)
-    tabledata = fireman.list_file_details(res, folder)
-    set_table_data("Table##widget", tabledata)
+    # the scan runs on its own thread, its rows are shown as they arrive (see render)
+    scan_id += 1
+    page = 0
+    view.clear()
+    show_page()
+    threading.Thread(target=scan, args=(folder, scan_id), daemon=True).start()
+
+def scan(folder, this_scan):
+    batch = list()
+    entries = fireman.iter_entries(folder, include_files=True, include_folders=False, include_sub_folders=True)
+    for row in fireman.iter_file_details(entries, folder):
+        batch.append(row)
+        if len(batch) >= BATCH_SIZE:
+            pending.put((this_scan, batch))
+            batch = list()
+    pending.put((this_scan, batch))
+
+def render(sender, data):
+    # called every frame: add the scanned rows on the gui thread, only the current page goes to the table
+    page_full = len(view) >= (page + 1) * PAGE_SIZE
+    added = False
+    while not pending.empty():
+        this_scan, rows = pending.get_nowait()
+        if this_scan == scan_id:
+            view.append(rows)
+            added = True
+
+    if added:
+        if page_full:
+            show_status()
+        else:
+            show_page()
+
+def show_page():
+    set_table_data("Table##widget", view.page(page, PAGE_SIZE))
+    show_status()
+
+def show_status():
+    pages = max(1, -(-len(view) // PAGE_SIZE))
+    set_value("status", f"page {page + 1} of {pages} - {len(view):,} of {len(view.rows):,} files")
+
+def change_page(sender, data):
+    global page
+    pages = max(1, -(-len(view) // PAGE_SIZE))
+    page = min(max(0, page + data), pages - 1)
+    show_page()
+
+def apply_filter(sender, data):
+    global page
+    page = 0
+    view.filter(get_value("Filter"))
+    show_page()
+
+def apply_sort(sender, data):
+    global page
+    page = 0
+    column = get_value("Sort by")
+    view.sort(None if column == SCAN_ORDER else column, ascending=get_value("Order") == "ascending")
+    show_page()
 
 show_logger()
 
@@ -25,8 +94,21 @@ with window("FiReMan", width=1200, height=400, x_pos=0, y_pos=0):
     add_same_line()
     add_label_text("##folder2", source="folder", color=[255, 255, 200])
 
-    header = ("fpn", "folder", "rpath", "rfolder", "filename", "name", "ext", "size", "mtime", "ctime")
+    header = ("fpn", "folder", "rpath", "rfolder", "filename", "name", "ext", "size", "mtime", "ctime", "is_file")
+    add_input_text("Filter", hint="filename contains", callback=apply_filter, width=200)
+    add_same_line()
+    add_combo("Sort by", items=(SCAN_ORDER,) + header, default_value=SCAN_ORDER, callback=apply_sort, width=120)
+    add_same_line()
+    add_combo("Order", items=("ascending", "descending"), default_value="ascending", callback=apply_sort, width=100)
+
+    add_button("<", callback=change_page, callback_data=-1)
+    add_same_line()
+    add_button(">", callback=change_page, callback_data=1)
+    add_same_line()
+    add_label_text("##status", source="status")
+
     add_table("Table##widget", header)
     apply_selected_directory("init", [os.getcwd(), ""])
 
-start_dearpygui()
\ No newline at end of file
+set_render_callback(render)
+start_dearpygui()
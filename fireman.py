@@ -1,8 +1,40 @@
 import os
+import sys
+import copy
 import re
+import asyncio
+import time
+import json
+import errno
+import fnmatch
+import hashlib
+import heapq
 import shutil
+import sqlite3
+import select
+import struct
+import threading
+import contextvars
+import ctypes
+import ctypes.util
 import pandas as pd
-from typing import Tuple, List
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pc = pq = None
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+from stat import S_ISREG, S_ISDIR, S_IMODE, S_IFREG
+from itertools import islice
+from collections import deque, namedtuple
+from functools import partial, wraps
+from contextlib import nullcontext
+from concurrent.futures import Executor, ThreadPoolExecutor, ProcessPoolExecutor, as_completed, TimeoutError as FutureTimeoutError
+from typing import Tuple, List, Iterable, Iterator, AsyncIterator
 from datetime import datetime
 
 
@@ -16,6 +48,33 @@ CSV_HEADERS = [HEADER_SOURCE_FPN, HEADER_TARGET_FPN, HEADER_ACTION]
 
 REGEX_RENAME_BASED_ON_FIELD = "filename"
 
+HEADER_CONFLICT = "conflict"
+HEADER_DUPLICATE_GROUP = "dup_group"
+CONFLICT_COLLISION = "collision"
+CONFLICT_CHAIN = "chain"
+CONFLICT_SWAP = "swap"
+CONFLICT_OVERWRITE = "overwrite"
+
+ON_COLLISION_REPORT = "report"
+ON_COLLISION_RAISE = "raise"
+ON_COLLISION_RENAME = "rename"
+ON_COLLISIONS = (ON_COLLISION_REPORT, ON_COLLISION_RAISE, ON_COLLISION_RENAME)
+
+_FICLONE = 0x40049409
+_HASH_CHUNK_SIZE = 1 << 20
+_ARROW_SAFE_REPLACEMENT = re.compile(r"(?:[^\\]|\\\\|\\[1-9](?!\d))*")
+# the only regex syntax sent to RE2 (pyarrow): literals, escaped punctuation, . ^ $ |, (capturing or (?:) groups,
+# [classes] of literals and ranges, * + ? {n} {n,} {n,m} (lazy or not), where it behaves as python re
+_ARROW_SAFE_PATTERN = re.compile(r"""(?:
+    [^\\\[\](){}?*+|^$.]
+  | \\[^A-Za-z0-9]
+  | [.^$|]
+  | \((?:\?:)?
+  | \)
+  | \[\^?\]?(?:[^\\\[\]]|\\[^A-Za-z0-9])*\]
+  | (?:[*+?]|\{\d+(?:,\d*)?\})\??
+)*""", re.VERBOSE)
+
 ACTION_MOVE = "MOVE"
 ACTION_RENAME = "RENAME"
 ACTION_COPY = "COPY"
@@ -24,6 +83,743 @@ ACTION_REMOVE_FOLDER = "RMDIR"
 ACTION_MOVE_FOLDER = "MOVEDIR"
 ACTIONS = (ACTION_MOVE, ACTION_RENAME, ACTION_COPY, ACTION_DELETE, ACTION_REMOVE_FOLDER, ACTION_MOVE_FOLDER)
 
+PRESERVE_ALL = "all"
+PRESERVE_TIMES = "times"
+PRESERVE_MODE = "mode"
+PRESERVE_NONE = "none"
+PRESERVES = (PRESERVE_ALL, PRESERVE_TIMES, PRESERVE_MODE, PRESERVE_NONE)
+
+_COMPACT_DERIVED_HEADERS = ("rpath", "name")
+_COMPACT_CATEGORY_HEADERS = ("folder", HEADER_RELATIVE_FOLDER, "ext", HEADER_ACTION)
+_COMPACT_STRING_DTYPE = "string[pyarrow]" if pa is not None else object
+_COMPACT_BATCH_SIZE = 100000
+
+# arrow schema of the HEADER[:-2] columns, as sent back by the scan_folders worker processes
+_SCAN_SCHEMA = pa.schema([(col_name, pa.string()) for col_name in HEADER[:7]] + [("size", pa.int64()), ("mtime", pa.timestamp("us")), ("ctime", pa.timestamp("us")), (HEADER_IS_FILE, pa.bool_())]) if pa is not None else None
+
+FORMAT_CSV = "csv"
+FORMAT_PARQUET = "parquet"
+FORMAT_FEATHER = "feather"
+
+KEEP_FIRST = "first"
+KEEP_LAST = "last"
+KEEP_OLDEST = "oldest"
+KEEP_NEWEST = "newest"
+KEEPS = (KEEP_FIRST, KEEP_LAST, KEEP_OLDEST, KEEP_NEWEST)
+
+# the active Stats of this thread/context (see Stats.__enter__ and _bind_stats), None when instrumentation is disabled
+_stats_var = contextvars.ContextVar("fireman_stats", default=None)
+_stats_tokens = contextvars.ContextVar("fireman_stats_tokens", default=())
+_NO_PHASE = nullcontext()
+
+
+class _StatsPhase:
+    __slots__ = ("stats", "name", "start")
+
+    def __init__(self, stats, name: str):
+        self.stats = stats
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.stats.add_time(self.name, time.perf_counter() - self.start)
+
+
+class Stats:
+    """
+    Instrumentation of the functions of this module, collected while it is active:
+        with Stats() as stats:
+            execute_actions(rows, ACTION_COPY, is_dryrun=False)
+        print(stats.to_json())
+    or FiReMan(instrument=True) (see FiReMan.stats).
+    phases   = {name: [calls, seconds]}, wall time of each FiReMan operation and of its inner phases
+               (scandir, stat, build_df, plan, conflicts, hash, mkdir, ...), the inner ones summed over the worker threads
+    syscalls = {name: count} of the filesystem calls (scandir, stat, mkdir, clone, copy_file_range, copyfile, rename, ...)
+    bytes    = {action: bytes} copied by each action
+    latency  = {action: [count per LATENCY_BUCKETS upper bound (seconds), then above the last one]}, plus latency_sum
+    A Stats is active in the thread (context) that entered it, and in the worker threads of the pools started there,
+    so overlapping operations on other threads are not mixed in. When no Stats is active, the instrumented code
+    only pays a context variable lookup.
+    """
+    LATENCY_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.phases = dict()
+            self.syscalls = dict()
+            self.bytes = dict()
+            self.latency = dict()
+            self.latency_sum = dict()
+        return self
+
+    def __enter__(self):
+        _stats_tokens.set(_stats_tokens.get() + (_stats_var.set(self),))
+        return self
+
+    def __exit__(self, *exc):
+        tokens = _stats_tokens.get()
+        _stats_tokens.set(tokens[:-1])
+        _stats_var.reset(tokens[-1])
+
+    def phase(self, name: str) -> _StatsPhase:
+        return _StatsPhase(self, name)
+
+    def add_time(self, name: str, seconds: float):
+        with self._lock:
+            phase = self.phases.setdefault(name, [0, 0.0])
+            phase[0] += 1
+            phase[1] += seconds
+
+    def count(self, syscall: str, n: int = 1):
+        with self._lock:
+            self.syscalls[syscall] = self.syscalls.get(syscall, 0) + n
+
+    def observe(self, action: str, seconds: float, size: int = 0):
+        with self._lock:
+            counts = self.latency.get(action)
+            if counts is None:
+                counts = self.latency[action] = [0] * (len(self.LATENCY_BUCKETS) + 1)
+            bucket = 0
+            while bucket < len(self.LATENCY_BUCKETS) and seconds > self.LATENCY_BUCKETS[bucket]:
+                bucket += 1
+            counts[bucket] += 1
+            self.latency_sum[action] = self.latency_sum.get(action, 0.0) + seconds
+            self.bytes[action] = self.bytes.get(action, 0) + size
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            return {
+                "phases": {name: {"calls": calls, "seconds": seconds} for name, (calls, seconds) in self.phases.items()},
+                "syscalls": dict(self.syscalls),
+                "bytes": dict(self.bytes),
+                "latency": {action: {"buckets": list(self.LATENCY_BUCKETS), "counts": list(counts), "sum": self.latency_sum[action]} for action, counts in self.latency.items()},
+            }
+
+    def to_json(self, indent: int = None) -> str:
+        return json.dumps(self.to_dict(), indent=indent)
+
+    def to_prometheus(self, prefix: str = "fireman") -> str:
+        """
+        Prometheus text exposition format (counters and one histogram)
+        """
+        data = self.to_dict()
+        lines = [f"# TYPE {prefix}_phase_seconds_total counter"]
+        lines += [f'{prefix}_phase_seconds_total{{phase="{name}"}} {phase["seconds"]}' for name, phase in data["phases"].items()]
+        lines.append(f"# TYPE {prefix}_phase_calls_total counter")
+        lines += [f'{prefix}_phase_calls_total{{phase="{name}"}} {phase["calls"]}' for name, phase in data["phases"].items()]
+        lines.append(f"# TYPE {prefix}_syscalls_total counter")
+        lines += [f'{prefix}_syscalls_total{{syscall="{name}"}} {count}' for name, count in data["syscalls"].items()]
+        lines.append(f"# TYPE {prefix}_bytes_total counter")
+        lines += [f'{prefix}_bytes_total{{action="{action}"}} {size}' for action, size in data["bytes"].items()]
+        lines.append(f"# TYPE {prefix}_action_latency_seconds histogram")
+        for action, latency in data["latency"].items():
+            cumulative = 0
+            for le, count in zip(list(latency["buckets"]) + ["+Inf"], latency["counts"]):
+                cumulative += count
+                lines.append(f'{prefix}_action_latency_seconds_bucket{{action="{action}",le="{le}"}} {cumulative}')
+            lines.append(f'{prefix}_action_latency_seconds_sum{{action="{action}"}} {latency["sum"]}')
+            lines.append(f'{prefix}_action_latency_seconds_count{{action="{action}"}} {cumulative}')
+        return "\n".join(lines) + "\n"
+
+
+def _phase(name: str):
+    stats = _stats_var.get()
+    return stats.phase(name) if stats is not None else _NO_PHASE
+
+
+def _count(syscall: str, n: int = 1):
+    stats = _stats_var.get()
+    if stats is not None:
+        stats.count(syscall, n)
+
+
+def _bind_stats(func: callable) -> callable:
+    # func, run with the Stats active here, for the threads of a pool (they don't inherit the caller's context)
+    stats = _stats_var.get()
+    if stats is None:
+        return func
+
+    def _bound(*args, **kwargs):
+        token = _stats_var.set(stats)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _stats_var.reset(token)
+    return _bound
+
+
+class ProgressThrottle:
+    """
+    Coalesce the per item callback_on_progress/callback_on_error calls of the functions of this module.
+    Progress is forwarded at most every 'interval' seconds and/or 'every' items (and always for the last item,
+    when current == total), as the data of the last item with a stats dict appended:
+        {"items_per_sec", "bytes_per_sec", "eta" (seconds, None if total is unknown), "elapsed", "bytes"}
+    bytes are summed from the last field of the items data when it is a size (int >= 0).
+    With batch_errors, errors are forwarded together with the progress, as a list of the data of each error.
+    Call flush() at the end of a run, to forward what is still pending (ex: when total is unknown).
+
+    throttle = ProgressThrottle(print_progress, print_errors, interval=0.5)
+    execute_actions(rows, ACTION_COPY, callback_on_progress=throttle.on_progress, callback_on_error=throttle.on_error)
+    throttle.flush()
+    """
+
+    def __init__(self, callback_on_progress: callable = None, callback_on_error: callable = None, interval: float = 0.25, every: int = 0, batch_errors: bool = True):
+        self.callback_on_progress = callback_on_progress
+        self.callback_on_error = callback_on_error
+        self.interval = interval
+        self.every = every
+        self.batch_errors = batch_errors
+        self._runs = dict()
+        self._errors = dict()
+
+    def on_progress(self, sender: str, data: list):
+        now = time.monotonic()
+        run = self._runs.get(sender)
+        total, current = data[0], data[1]
+
+        # current going back means a new run of the same sender
+        if run is None or current < run["current"]:
+            run = self._runs[sender] = {"start": now, "last": now, "current": 0, "forwarded": 0, "bytes": 0, "data": None}
+
+        size = data[-1]
+        if isinstance(size, int) and not isinstance(size, bool) and size > 0:
+            run["bytes"] += size
+        run["current"] = current
+        run["data"] = data
+
+        if (total and current >= total) or (self.interval and now - run["last"] >= self.interval) or (self.every and current - run["forwarded"] >= self.every):
+            self._forward(sender, run, now)
+
+    def on_error(self, sender: str, data: list):
+        if not self.batch_errors:
+            if self.callback_on_error:
+                self.callback_on_error(sender, data)
+            return
+
+        self._errors.setdefault(sender, list()).append(data)
+        if sender not in self._runs:
+            self._flush_errors(sender)
+
+    def _flush_errors(self, sender: str):
+        errors = self._errors.pop(sender, None)
+        if errors and self.callback_on_error:
+            self.callback_on_error(sender, errors)
+
+    def _forward(self, sender: str, run: dict, now: float):
+        self._flush_errors(sender)
+
+        elapsed = now - run["start"]
+        total, current = run["data"][0], run["current"]
+        items_per_sec = current / elapsed if elapsed > 0 else None
+        stats = {
+            "items_per_sec": items_per_sec,
+            "bytes_per_sec": run["bytes"] / elapsed if elapsed > 0 else None,
+            "eta": (total - current) / items_per_sec if total and items_per_sec else None,
+            "elapsed": elapsed,
+            "bytes": run["bytes"],
+        }
+        run["last"] = now
+        run["forwarded"] = current
+
+        if self.callback_on_progress:
+            self.callback_on_progress(sender, run["data"] + [stats])
+
+    def flush(self):
+        now = time.monotonic()
+        for sender, run in list(self._runs.items()):
+            if run["forwarded"] != run["current"]:
+                self._forward(sender, run, now)
+        for sender in list(self._errors):
+            self._flush_errors(sender)
+        self._runs = dict()
+        return self
+
+
+def _scandir(path: str) -> List[os.DirEntry]:
+    with _phase("scandir"):
+        with os.scandir(path) as it:
+            entries = list(it)
+
+        # resolve the entry type here, so it runs on the worker thread when d_type is unknown (ex: some network filesystems)
+        for entry in entries:
+            entry.is_dir()
+
+    _count("scandir")
+    return entries
+
+
+_CachedStat = namedtuple("_CachedStat", ["st_mode", "st_size", "st_mtime", "st_ctime"])
+
+
+class _CachedEntry:
+    """
+    Minimal os.DirEntry look-alike, built from a ScanCache row
+    """
+    __slots__ = ("name", "path", "_stat")
+
+    def __init__(self, folder: str, name: str, mode: int, size: int, mtime: float, ctime: float):
+        self.name = name
+        self.path = os.path.join(folder, name)
+        self._stat = None if mode is None else _CachedStat(mode, size, mtime, ctime)
+
+    def is_dir(self) -> bool:
+        return self._stat is not None and S_ISDIR(self._stat.st_mode)
+
+    def is_file(self) -> bool:
+        return self._stat is not None and S_ISREG(self._stat.st_mode)
+
+    def stat(self) -> _CachedStat:
+        if self._stat is None:
+            raise FileNotFoundError(2, "No such file or directory (cached)", self.path)
+        return self._stat
+
+
+class ScanCache:
+    """
+    Persistent (SQLite) cache of folder listings, keyed by the folder mtime.
+    A folder whose mtime did not change since it was cached is not listed again, and the stat of its entries
+    comes from the cache, so a rescan costs one stat per folder instead of one per file.
+    Note: changing the content of an existing file does not change its folder mtime, so size/mtime/ctime of
+    such files are only refreshed when something else changes on that folder.
+
+    frm.scan_folder(path, cache=ScanCache("scan.db"))
+    """
+
+    # folders modified this close to the moment they were cached may change again without a visible mtime change
+    RACY_NS = 2_000_000_000
+
+    def __init__(self, filename: str):
+        self.filename = filename
+        self.reused_folders = 0
+        self.rescanned_folders = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(filename, check_same_thread=False)
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS folders (path TEXT PRIMARY KEY, mtime_ns INTEGER, scanned_ns INTEGER);
+            CREATE TABLE IF NOT EXISTS entries (folder TEXT, name TEXT, mode INTEGER, size INTEGER, mtime REAL, ctime REAL);
+            CREATE INDEX IF NOT EXISTS entries_folder ON entries (folder);
+        """)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def reset_counters(self):
+        self.reused_folders = self.rescanned_folders = 0
+        return self
+
+    def scandir(self, path: str) -> list:
+        mtime_ns = os.stat(path).st_mtime_ns
+
+        with self._lock:
+            row = self._db.execute("SELECT mtime_ns, scanned_ns FROM folders WHERE path = ?", (path,)).fetchone()
+            if row and row[0] == mtime_ns and row[1] - mtime_ns > self.RACY_NS:
+                rows = self._db.execute("SELECT name, mode, size, mtime, ctime FROM entries WHERE folder = ? ORDER BY rowid", (path,)).fetchall()
+                self.reused_folders += 1
+                return [_CachedEntry(path, *row) for row in rows]
+
+        scanned_ns = time.time_ns()
+        entries = _scandir(path)
+        rows = list()
+        for entry in entries:
+            try:
+                stat = entry.stat()
+                rows.append((path, entry.name, stat.st_mode, stat.st_size, stat.st_mtime, stat.st_ctime))
+            except OSError:
+                rows.append((path, entry.name, None, None, None, None))
+
+        with self._lock:
+            self._db.execute("DELETE FROM entries WHERE folder = ?", (path,))
+            self._db.executemany("INSERT INTO entries VALUES (?, ?, ?, ?, ?, ?)", rows)
+            self._db.execute("INSERT OR REPLACE INTO folders VALUES (?, ?, ?)", (path, mtime_ns, scanned_ns))
+            self.rescanned_folders += 1
+
+        return entries
+
+    def save(self):
+        with self._lock:
+            self._db.commit()
+        return self
+
+    def close(self):
+        self.save()
+        self._db.close()
+
+
+def _ordered_map(pool: Executor, func: callable, iterable: Iterable, window: int) -> Iterator:
+    """
+    Like pool.map, but keeping at most 'window' calls in flight, so long iterables are not submitted all at once
+    """
+    pending = deque()
+    func = _bind_stats(func)
+    for item in iterable:
+        pending.append(pool.submit(func, item))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+
+    while pending:
+        yield pending.popleft().result()
+
+
+class ScanFilter:
+    """
+    Scan-time filters for iter_entries/scan_folder, all patterns compiled once:
+    exclude = glob patterns (ex: [".git", "node_modules", "*.tmp"]) matched on the entry name, excluded folders are not walked
+    exclude_regex = regex searched on the full-path-name, excluded folders are not walked
+    max_depth = 0 only the entries of path, 1 also of its sub-folders, ... (None = no limit)
+    extensions = only files with these extensions (without dot, case insensitive)
+    min_size/max_size = only files with size in bytes within these limits
+    newer_than/older_than = only files with mtime within these limits (datetime or timestamp)
+    Name based filters are evaluated first, size/mtime ones use the stat that is then reused by iter_file_details.
+    """
+
+    def __init__(self,
+                 exclude: List[str] = None,
+                 exclude_regex: str = "",
+                 max_depth: int = None,
+                 extensions: List[str] = None,
+                 min_size: int = None,
+                 max_size: int = None,
+                 newer_than: Tuple[datetime, float] = None,
+                 older_than: Tuple[datetime, float] = None):
+        flags = re.IGNORECASE if os.path.normcase("A") == "a" else 0
+        self.exclude = re.compile("|".join(fnmatch.translate(pattern) for pattern in exclude), flags) if exclude else None
+        self.exclude_regex = re.compile(exclude_regex) if exclude_regex else None
+        self.max_depth = max_depth
+        self.extensions = {"." + ext.lstrip(".").lower() for ext in extensions} if extensions else None
+        self.min_size = min_size
+        self.max_size = max_size
+        self.newer_than = newer_than.timestamp() if isinstance(newer_than, datetime) else newer_than
+        self.older_than = older_than.timestamp() if isinstance(older_than, datetime) else older_than
+        self.needs_stat = any(limit is not None for limit in (min_size, max_size, self.newer_than, self.older_than))
+
+    def is_excluded(self, entry) -> bool:
+        return bool((self.exclude and self.exclude.match(entry.name)) or (self.exclude_regex and self.exclude_regex.search(entry.path)))
+
+    def is_file_accepted(self, entry) -> bool:
+        if self.extensions is not None and os.path.splitext(entry.name)[1].lower() not in self.extensions:
+            return False
+
+        if self.needs_stat:
+            try:
+                stat = entry.stat()
+            except OSError:
+                return False
+            if (self.min_size is not None and stat.st_size < self.min_size) or (self.max_size is not None and stat.st_size > self.max_size):
+                return False
+            if (self.newer_than is not None and stat.st_mtime < self.newer_than) or (self.older_than is not None and stat.st_mtime > self.older_than):
+                return False
+
+        return True
+
+
+def iter_entries(path: str = "",
+                 include_files: bool = True,
+                 include_folders: bool = True,
+                 include_sub_folders: bool = False,
+                 filename_regex_filter: str = "",
+                 callback_on_error: callable = None,
+                 workers: int = 0,
+                 cache: ScanCache = None,
+                 scan_filter: ScanFilter = None) -> Iterator[os.DirEntry]:
+    """
+    Walk path with os.scandir, yielding the DirEntry of every matching file/folder.
+    The d_type (and on Windows the stat) cached by the DirEntry is reused, so no extra syscalls are made per entry.
+    workers > 1 lists sub-folders concurrently on a thread pool, still yielding in the same order as the serial walk.
+    cache = ScanCache, to reuse the listing of folders that did not change since the previous scan
+    scan_filter = ScanFilter, to prune sub-trees and filter files while walking
+    """
+    if not path:
+        path = os.getcwd()
+
+    sender = "LIST_FILES"
+    scandir = cache.scandir if cache else _scandir
+    regex = re.compile(filename_regex_filter) if filename_regex_filter else None
+    max_depth = scan_filter.max_depth if scan_filter and scan_filter.max_depth is not None else -1
+
+    if scan_filter and scan_filter.needs_stat and workers and workers > 1:
+        # stat the files on the worker thread that lists the folder
+        scandir_folder = scandir
+
+        def scandir(folder):
+            entries = scandir_folder(folder)
+            for entry in entries:
+                try:
+                    entry.stat()
+                except OSError:
+                    pass
+            return entries
+
+    def _walk(folder, listing, depth):
+        try:
+            entries = listing()
+        except Exception as e:
+            if callback_on_error:
+                callback_on_error(sender, [folder, e])
+            return
+
+        if scan_filter and (scan_filter.exclude or scan_filter.exclude_regex):
+            entries = [entry for entry in entries if not scan_filter.is_excluded(entry)]
+
+        # with a pool, all sub-folders of this folder are submitted before descending into the first one
+        walk_sub_folders = include_sub_folders and depth != max_depth
+        sub_folders = [_listing(entry.path) if walk_sub_folders and entry.is_dir() else None for entry in entries]
+
+        for entry, sub_folder in zip(entries, sub_folders):
+            if not regex or regex.search(entry.name):
+                if include_files and entry.is_file():
+                    if not scan_filter or scan_filter.is_file_accepted(entry):
+                        yield entry
+                elif include_folders and entry.is_dir():
+                    yield entry
+
+            if sub_folder:
+                yield from _walk(entry.path, sub_folder, depth + 1)
+
+    if workers and workers > 1:
+        pool = ThreadPoolExecutor(max_workers=workers)
+        bound_scandir = _bind_stats(scandir)
+        _listing = lambda folder: pool.submit(bound_scandir, folder).result
+        try:
+            yield from _walk(path, _listing(path), 0)
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+    else:
+        _listing = lambda folder: lambda: scandir(folder)
+        yield from _walk(path, _listing(path), 0)
+
+
+def _file_details(entry, fpn: str, relative_path: int) -> tuple:
+    stats = _stats_var.get()
+    if stats is not None:
+        with stats.phase("stat"):
+            stat = os.stat(fpn) if isinstance(entry, str) else entry.stat()
+        stats.count("stat")
+    else:
+        stat = os.stat(fpn) if isinstance(entry, str) else entry.stat()
+
+    folder, filename = os.path.split(fpn)
+    rpath = fpn[relative_path:].lstrip(os.sep)
+    rfolder = folder[relative_path:].lstrip(os.sep)
+    name, extension = os.path.splitext(filename)
+    md_time = datetime.fromtimestamp(stat.st_mtime)
+    cr_time = datetime.fromtimestamp(stat.st_ctime)
+
+    return (fpn, folder, rpath, rfolder, filename, name, extension[1:], stat.st_size, md_time, cr_time, S_ISREG(stat.st_mode))
+
+
+def iter_file_details(entries: Iterable,
+                      relative_path: Tuple[str, int] = None,
+                      total: int = 0,
+                      callback_on_error: callable = None,
+                      callback_on_progress: callable = None,
+                      workers: int = 0) -> Iterator[tuple]:
+    """
+    entries = iterable of os.DirEntry (as yielded by iter_entries) or full-path-name strings
+    yields one tuple per entry with the HEADER[:-2] columns, stat-ing each entry only once
+    workers > 1 runs the stat calls on a thread pool, results (and callbacks) stay in the order of entries
+    """
+    if relative_path:
+        if isinstance(relative_path, str):
+            relative_path = len(relative_path)
+    else:
+        relative_path = 0
+
+    sender = "LIST_FILE_DETAILS"
+    current = 0
+
+    def _details(entry):
+        fpn = entry if isinstance(entry, str) else entry.path
+        try:
+            return fpn, _file_details(entry, fpn, relative_path), None
+        except Exception as e:
+            return fpn, None, e
+
+    if workers and workers > 1:
+        pool = ThreadPoolExecutor(max_workers=workers)
+        results = _ordered_map(pool, _details, entries, window=workers * 64)
+    else:
+        pool = None
+        results = map(_details, entries)
+
+    try:
+        for fpn, attr, error in results:
+            current += 1
+
+            if error is None:
+                filesize = attr[7]
+                yield attr
+            else:
+                filesize = -1
+                if callback_on_error:
+                    callback_on_error(sender, [fpn, error])
+
+            if callback_on_progress:
+                callback_on_progress(sender, [total, current, fpn, filesize])
+    finally:
+        if pool:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+
+def scan_file_details(path: str = "",
+                      include_files: bool = True,
+                      include_folders: bool = True,
+                      include_sub_folders: bool = False,
+                      filename_regex_filter: str = "",
+                      relative_path: Tuple[str, int] = None,
+                      callback_on_error: callable = None,
+                      callback_on_progress: callable = None,
+                      workers: int = 0,
+                      cache: ScanCache = None,
+                      scan_filter: ScanFilter = None,
+                      check_cancelled: callable = None) -> List[tuple]:
+    """
+    Single pass equivalent of list_file_details(list_files(path, ...), path)
+    check_cancelled = func() called for every entry listed (before any progress is reported), raising to stop the scan
+    """
+    if not path:
+        path = os.getcwd()
+
+    entries = iter_entries(path, include_files=include_files, include_folders=include_folders, include_sub_folders=include_sub_folders, filename_regex_filter=filename_regex_filter, callback_on_error=callback_on_error, workers=workers, cache=cache, scan_filter=scan_filter)
+    if check_cancelled is not None:
+        entries = (check_cancelled() or entry for entry in entries)
+    entries = list(entries)
+    return list(iter_file_details(entries, path if relative_path is None else relative_path, total=len(entries), callback_on_error=callback_on_error, callback_on_progress=callback_on_progress, workers=workers))
+
+
+def _rows_to_batch(rows: List[tuple]):
+    # columnar form of the iter_file_details rows: arrow IPC stream bytes, or a dict of column lists without pyarrow
+    columns = dict(zip(HEADER[:-2], map(list, zip(*rows)))) if rows else {col_name: [] for col_name in HEADER[:-2]}
+    if pa is None:
+        return columns
+
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, _SCAN_SCHEMA) as writer:
+        writer.write_table(pa.table(columns, schema=_SCAN_SCHEMA))
+    return sink.getvalue().to_pybytes()
+
+
+def _batch_to_df(batch) -> pd.DataFrame:
+    if isinstance(batch, dict):
+        return pd.DataFrame(batch, columns=HEADER[:-2])
+    return pa.ipc.open_stream(batch).read_all().to_pandas()
+
+
+def _scan_shard(path: str, relative_path: int, include_sub_folders: bool, scan_filter: ScanFilter, kwargs: dict) -> tuple:
+    # runs on a scan_folders worker process, errors are sent back to be reported by the calling process
+    errors = list()
+    on_error = lambda sender, data: errors.append((sender, data))
+    entries = iter_entries(path, include_sub_folders=include_sub_folders, callback_on_error=on_error, scan_filter=scan_filter, **kwargs)
+    rows = list(iter_file_details(entries, relative_path, callback_on_error=on_error, workers=kwargs["workers"]))
+    return _rows_to_batch(rows), errors
+
+
+def _scan_shards(paths: Iterable[str], include_sub_folders: bool, scan_filter: ScanFilter, split: bool) -> List[tuple]:
+    """
+    (path, relative_path, include_sub_folders, scan_filter) of each shard: one per root, or with split, one for the
+    top level entries of each root plus one per top level sub-folder (scanned with max_depth reduced by 1)
+    """
+    shards = list()
+    for path in paths:
+        path = path or os.getcwd()
+        relative_path = len(path)
+        shards.append((path, relative_path, include_sub_folders and not split, scan_filter))
+        if not (split and include_sub_folders) or (scan_filter and scan_filter.max_depth == 0):
+            continue
+
+        sub_filter = scan_filter
+        if scan_filter and scan_filter.max_depth is not None:
+            sub_filter = copy.copy(scan_filter)
+            sub_filter.max_depth -= 1
+
+        try:
+            entries = _scandir(path)
+        except OSError:
+            # reported by the shard of the root itself
+            continue
+
+        for entry in entries:
+            if entry.is_dir() and not (scan_filter and scan_filter.is_excluded(entry)):
+                shards.append((entry.path, relative_path, True, sub_filter))
+
+    return shards
+
+
+def iter_scan_folders(paths: Iterable[str],
+                      include_files: bool = True,
+                      include_folders: bool = True,
+                      include_sub_folders: bool = False,
+                      filename_regex_filter: str = "",
+                      callback_on_error: callable = None,
+                      callback_on_progress: callable = None,
+                      processes: int = 0,
+                      workers: int = 0,
+                      scan_filter: ScanFilter = None) -> Iterator[pd.DataFrame]:
+    """
+    scan_file_details of several paths, sharded over a pool of processes, yielding one DataFrame (HEADER[:-2] columns,
+    relative to the root each row was found in) per shard, in order.
+    When there are fewer paths than processes, each root is split in its top level entries and one shard per top
+    level sub-folder, so the rows of a root come grouped by shard instead of in the walk order of scan_file_details.
+    processes <= 1 scans the shards in this process, workers = threads of each shard (see iter_entries)
+    Workers send back their rows as arrow IPC batches (column lists without pyarrow), not as pickled tuples.
+    callback_on_progress = func("SCAN_FOLDERS", [total shards, current, shard path, rows, bytes])
+    """
+    sender = "SCAN_FOLDERS"
+    paths = list(paths)
+    shards = _scan_shards(paths, include_sub_folders, scan_filter, split=processes > 1 and len(paths) < processes)
+    kwargs = dict(include_files=include_files, include_folders=include_folders, filename_regex_filter=filename_regex_filter, workers=workers)
+    scan = partial(_scan_shard, kwargs=kwargs)
+
+    if processes > 1:
+        pool = ProcessPoolExecutor(max_workers=processes)
+        results = pool.map(scan, *zip(*shards))
+    else:
+        pool = None
+        results = (scan(*shard) for shard in shards)
+
+    try:
+        for current, (shard, (batch, errors)) in enumerate(zip(shards, results), start=1):
+            if callback_on_error:
+                for error in errors:
+                    callback_on_error(*error)
+
+            df = _batch_to_df(batch)
+            if callback_on_progress:
+                callback_on_progress(sender, [len(shards), current, shard[0], len(df), int(df["size"].sum())])
+            yield df
+    finally:
+        if pool:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+
+def scan_folders(paths: Iterable[str],
+                 include_files: bool = True,
+                 include_folders: bool = True,
+                 include_sub_folders: bool = False,
+                 filename_regex_filter: str = "",
+                 callback_on_error: callable = None,
+                 callback_on_progress: callable = None,
+                 processes: int = 0,
+                 workers: int = 0,
+                 scan_filter: ScanFilter = None) -> pd.DataFrame:
+    """
+    All iter_scan_folders DataFrames in one, without the entries found in more than one path
+    """
+    paths = list(paths)
+    frames = list(iter_scan_folders(paths, include_files=include_files, include_folders=include_folders, include_sub_folders=include_sub_folders, filename_regex_filter=filename_regex_filter, callback_on_error=callback_on_error, callback_on_progress=callback_on_progress, processes=processes, workers=workers, scan_filter=scan_filter))
+    df = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0] if frames else _batch_to_df(_rows_to_batch([]))
+    return df.drop_duplicates(HEADER_SOURCE_FPN, ignore_index=True) if len(paths) > 1 else df
+
 
 def list_files(path: str = "", 
                include_full_path_name: bool = True,
@@ -35,28 +831,10 @@ def list_files(path: str = "",
         path = os.getcwd()
     
     if include_files and include_folders and not include_sub_folders and not filename_regex_filter:
-        result = [os.path.join(path, f) for f in os.listdir(path)] if include_full_path_name else os.listdir(path)
-    else:
-        result = list()
-        try:
-            for f in os.listdir(path):
-                fpn = os.path.join(path, f)
-                is_match = not filename_regex_filter or re.search(filename_regex_filter, f)
-
-                if (include_files and os.path.isfile(fpn) and is_match) or (include_folders and os.path.isdir(fpn) and is_match):
-                    result.append(fpn if include_full_path_name else f)
-
-                if include_sub_folders and os.path.isdir(fpn):
-                    result += list_files(fpn,
-                                    include_full_path_name=include_full_path_name,
-                                    include_files=include_files,
-                                    include_folders=include_folders,
-                                    include_sub_folders=include_sub_folders,
-                                    filename_regex_filter=filename_regex_filter)
-        except Exception:
-            pass
+        return [os.path.join(path, f) for f in os.listdir(path)] if include_full_path_name else os.listdir(path)
 
-    return result
+    entries = iter_entries(path, include_files=include_files, include_folders=include_folders, include_sub_folders=include_sub_folders, filename_regex_filter=filename_regex_filter)
+    return [entry.path if include_full_path_name else entry.name for entry in entries]
 
 
 def list_folders(path: str = "",
@@ -71,232 +849,2046 @@ def list_folders(path: str = "",
 def list_file_details(list_of_fpn_files: list,
                       relative_path: Tuple[str, int] = None,
                       callback_on_error: callable = None,
-                      callback_on_progress: callable = None) -> List[tuple]:
-    if relative_path:
-        if isinstance(relative_path, str):
-            relative_path = len(relative_path)
-    else:
-        relative_path = 0
+                      callback_on_progress: callable = None,
+                      workers: int = 0) -> List[tuple]:
+    return list(iter_file_details(list_of_fpn_files, relative_path, total=len(list_of_fpn_files), callback_on_error=callback_on_error, callback_on_progress=callback_on_progress, workers=workers))
 
-    sender = "LIST_FILE_DETAILS"
-    total = len(list_of_fpn_files)
+
+def list_empty_folders(path: str, workers: int = 0) -> list:
+    # single walk: keep all folders, and for each file mark its folder and ancestors as occupied
+    folders = list()
+    occupied = set()
+    for entry in iter_entries(path, include_files=True, include_folders=True, include_sub_folders=True, workers=workers):
+        if entry.is_dir():
+            folders.append(entry.path)
+        else:
+            # stop at the first folder already marked, all above it are marked too (linear on the number of folders)
+            folder = os.path.dirname(entry.path)
+            while folder not in occupied and len(folder) > len(path):
+                occupied.add(folder)
+                folder = os.path.dirname(folder)
+
+    empty_folders = [folder for folder in folders if folder not in occupied]
+    empty_folders.sort(key=str.lower, reverse=True)
+
+    return empty_folders
+
+
+def _is_on_device(st_dev: int, dst: str) -> bool:
+    try:
+        return st_dev == os.stat(os.path.dirname(os.path.abspath(dst))).st_dev
+    except OSError:
+        return False
+
+
+def _copy_data_in_kernel(src: str, dst: str) -> bool:
+    """
+    Same filesystem copy without passing the data through user space: reflink (copy-on-write clone) when the
+    filesystem supports it (btrfs, xfs, ...), else copy_file_range. Returns False if none is available.
+    """
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        fd_src, fd_dst = fsrc.fileno(), fdst.fileno()
+        try:
+            _count("clone")
+            fcntl.ioctl(fd_dst, _FICLONE, fd_src)
+            return True
+        except OSError:
+            pass
+
+        if not hasattr(os, "copy_file_range"):
+            return False
+
+        remaining = os.fstat(fd_src).st_size
+        try:
+            while remaining > 0:
+                _count("copy_file_range")
+                copied = os.copy_file_range(fd_src, fd_dst, min(remaining, 1 << 30))
+                if copied == 0:
+                    break
+                remaining -= copied
+        except OSError as e:
+            if e.errno in (errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.EPERM):
+                return False
+            raise
+
+        return True
+
+
+def _copy_metadata(src: str, dst: str, preserve_metadata: str):
+    if preserve_metadata == PRESERVE_ALL:
+        _count("copystat")
+        shutil.copystat(src, dst)
+    elif preserve_metadata in (PRESERVE_TIMES, PRESERVE_MODE):
+        stat = os.stat(src)
+        if preserve_metadata == PRESERVE_TIMES:
+            _count("utime")
+            os.utime(dst, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        else:
+            _count("chmod")
+            os.chmod(dst, S_IMODE(stat.st_mode))
+
+
+def _copy_file(src: str, dst: str, preserve_metadata: str) -> Tuple[str, int]:
+    if preserve_metadata not in PRESERVES:
+        raise ValueError(f"preserve_metadata must be one of {PRESERVES}")
+
+    if os.path.isdir(dst):
+        dst = os.path.join(dst, os.path.basename(src))
+
+    if os.path.exists(dst) and os.path.samefile(src, dst):
+        raise shutil.SameFileError(f"{src!r} and {dst!r} are the same file")
+
+    stat = os.stat(src)
+    if not (fcntl and S_ISREG(stat.st_mode) and _is_on_device(stat.st_dev, dst) and _copy_data_in_kernel(src, dst)):
+        _count("copyfile")
+        shutil.copyfile(src, dst)
+
+    _copy_metadata(src, dst, preserve_metadata)
+    return dst, stat.st_size
+
+
+def copy_file(src: str, dst: str, preserve_metadata: str = PRESERVE_ALL) -> str:
+    """
+    Like shutil.copy2, but on the same device the data is cloned/copied in kernel (see _copy_data_in_kernel),
+    and elsewhere it relies on shutil.copyfile (sendfile on linux, fcopyfile on macOS).
+    preserve_metadata = PRESERVE_ALL (shutil.copystat), PRESERVE_TIMES, PRESERVE_MODE or PRESERVE_NONE
+    """
+    return _copy_file(src, dst, preserve_metadata)[0]
+
+
+def move_file(src: str, dst: str, preserve_metadata: str = PRESERVE_ALL) -> str:
+    """
+    Like shutil.move (files or folders), but a move within the same device is always a single os.replace
+    (os.rename for folders), overwriting an existing dst file on Windows too.
+    Only across devices (or when the rename fails) the data is copied (copy_file) and the source removed.
+    """
+    if os.path.isdir(dst):
+        dst = os.path.join(dst, os.path.basename(src.rstrip(os.sep)))
+
+    src_stat = os.lstat(src)
+    if _is_on_device(src_stat.st_dev, dst):
+        _count("rename")
+        try:
+            if S_ISDIR(src_stat.st_mode):
+                os.rename(src, dst)
+            else:
+                os.replace(src, dst)
+            return dst
+        except OSError:
+            pass
+
+    return shutil.move(src, dst, copy_function=lambda s, d: copy_file(s, d, preserve_metadata))
+
+
+def _decode_actions(list_of_fpn_files: List[tuple], action: str) -> List[tuple]:
+    src = dst = ""
+    rows = list()
+    for row in list_of_fpn_files:
+        if isinstance(row, str):
+            src = row
+        else:
+            if len(row) == 3:
+                src, dst, action = row
+            elif len(row) == 2:
+                src, dst = row
+            else:
+                raise ValueError(f"'list_of_fpn_files' parameter values not of valid type {type(row)}")
+        rows.append((action, src, dst))
+
+    return rows
+
+
+def _execution_waves(rows: List[tuple]) -> List[List[tuple]]:
+    """
+    Split rows of (action, src, dst) in waves, where all rows of the same wave can run concurrently.
+    A row that touches a path equal to, above or below a path touched by a previous row goes to a later wave,
+    so the order of the list is kept where it matters (ex: RMDIR of children before the parent, chained MOVEDIR).
+    """
+    path_wave = dict()      # path -> last wave that touched it
+    below_wave = dict()     # folder -> last wave that touched something below it
+    waves = list()
+
+    for row in rows:
+        paths = list()
+        wave = 0
+        for path in row[1:]:
+            if not path:
+                continue
+            path = os.path.normcase(os.path.abspath(path))
+            ancestors = list()
+            folder = os.path.dirname(path)
+            while folder not in ancestors[-1:]:
+                ancestors.append(folder)
+                folder = os.path.dirname(folder)
+
+            wave = max(wave, path_wave.get(path, -1) + 1, below_wave.get(path, -1) + 1, *[path_wave.get(folder, -1) + 1 for folder in ancestors])
+            paths.append((path, ancestors))
+
+        for path, ancestors in paths:
+            path_wave[path] = wave
+            for folder in ancestors:
+                below_wave[folder] = max(below_wave.get(folder, -1), wave)
+
+        if wave == len(waves):
+            waves.append(list())
+        waves[wave].append(row)
+
+    return waves
+
+
+ActionPlan = namedtuple("ActionPlan", ["rows", "folders", "conflicts"])
+
+
+def _path_key(path: str) -> str:
+    return os.path.normcase(os.path.abspath(path))
+
+
+def plan_actions(rows: List[tuple], check_existing: bool = False, exists: callable = os.path.lexists) -> ActionPlan:
+    """
+    Planning stage of execute_actions, for rows of (action, src, dst):
+    rows      = the rows in a safe execution order, for every action: a row reading a path (its src) runs before the
+                rows overwriting that path (A->B, B->C runs B->C first), and before the row moving/deleting it away.
+                Cycles (A->B, B->A) are broken through a temporary name: A->tmp (same action), B->A, then tmp->B
+                (same action, MOVE for COPY, so the temporary copy does not stay behind).
+                A row reading a path that does not exist yet, written by an earlier row, runs after it (A->B, then B->C).
+    folders   = destination folders to create upfront (deepest only, makedirs creates their parents), leaving out
+                the ones under a path that rows move/copy to or away from, those are still created row by row
+    conflicts = [(row, CONFLICT_COLLISION|CONFLICT_CHAIN|CONFLICT_SWAP|CONFLICT_OVERWRITE), ...] of the input rows,
+                CONFLICT_OVERWRITE (destination exists and is not moved/deleted away first) only with check_existing.
+                Chains and swaps are made safe by the order, collisions and overwrites are not.
+    exists = func(path) telling if a path exists, a resumed run passes ExecutionJournal.existed (the paths as they
+    were before the journaled rows ran) and, as the temporary names only depend on the rows, plans the same rows.
+    """
+    vacates = (ACTION_MOVE, ACTION_RENAME, ACTION_MOVE_FOLDER, ACTION_DELETE, ACTION_REMOVE_FOLDER)
+    src_keys = [_path_key(src) if src else "" for _, src, _ in rows]
+    dst_keys = [_path_key(dst) if dst and action not in (ACTION_DELETE, ACTION_REMOVE_FOLDER) else "" for action, _, dst in rows]
+
+    read_by = dict()        # path -> rows reading it (every action reads its src)
+    written_by = dict()     # path -> rows writing it
+    for i in range(len(rows)):
+        if src_keys[i]:
+            read_by.setdefault(src_keys[i], list()).append(i)
+        if dst_keys[i] and dst_keys[i] != src_keys[i]:
+            written_by.setdefault(dst_keys[i], list()).append(i)
+
+    # preds[n] = {row that must run before n: reason}, succs[n] = rows waiting for n
+    # reason "read": n overwrites a path m reads (the only kind of edge that can close a cycle),
+    # "vacate": n moves/deletes a path m copies, "sequence": n reads a path m writes first
+    preds = [dict() for _ in rows]
+    succs = [list() for _ in rows]
+
+    def _edge(m, n, reason):
+        if m != n and m not in preds[n]:
+            preds[n][m] = reason
+            succs[m].append(n)
+
+    conflicts = list()
+    existing = dict()
+    for key, writers in written_by.items():
+        readers = read_by.get(key, ())
+        for w in writers:
+            for r in readers:
+                if r < w:
+                    _edge(r, w, "read")
+                else:
+                    if key not in existing:
+                        existing[key] = exists(rows[r][1])
+                    if existing[key]:
+                        _edge(r, w, "read")
+                    else:
+                        _edge(w, r, "sequence")
+
+            action, src, dst = rows[w]
+            if len(writers) > 1:
+                conflicts.append((rows[w], CONFLICT_COLLISION))
+            elif any(dst_keys[r] == src_keys[w] for r in readers):
+                conflicts.append((rows[w], CONFLICT_SWAP))
+            elif readers:
+                conflicts.append((rows[w], CONFLICT_CHAIN))
+            elif check_existing and exists(dst):
+                conflicts.append((rows[w], CONFLICT_OVERWRITE))
+
+    for key, readers in read_by.items():
+        if len(readers) > 1:
+            for v in readers:
+                if rows[v][0] in vacates:
+                    for r in readers:
+                        if rows[r][0] not in vacates:
+                            _edge(r, v, "vacate")
+
+    # topological order, keeping the order of the rows wherever the edges allow it
+    order = list(range(len(rows)))
+    nodes = list(rows)
+    heap = [(i, i) for i in order if not preds[i]]
+    heapq.heapify(heap)
+    ordered = list()
+    remaining = len(rows)
+    while remaining:
+        if not heap:
+            # cycle: split the first row overwriting a path still to be read in A->tmp and tmp->B
+            n = min((n for n in range(len(nodes)) if preds[n] and "read" in preds[n].values()), key=order.__getitem__)
+            action, src, dst = nodes[n]
+            src_path = src.rstrip(os.sep)
+            tmp = os.path.join(os.path.dirname(src_path), f".fireman-tmp-{order[n]}-{os.path.basename(src_path)}")
+            first, second = len(nodes), len(nodes) + 1
+            nodes += [(action, src, tmp), (ACTION_MOVE if action == ACTION_COPY else action, tmp, dst)]
+            order += [order[n], order[n]]
+            preds += [dict(), dict()]
+            succs += [list(), list()]
+            for m, reason in preds[n].items():
+                succs[m][succs[m].index(n)] = second if reason == "read" else first
+                preds[second if reason == "read" else first][m] = reason
+            for m in succs[n]:
+                reason = preds[m].pop(n)
+                preds[m][first if reason in ("read", "vacate") else second] = reason
+                succs[first if reason in ("read", "vacate") else second].append(m)
+            _edge(first, second, "sequence")
+            preds[n] = dict()
+            succs[n] = list()
+            remaining += 1
+            if not preds[first]:
+                heapq.heappush(heap, (order[first], first))
+            continue
+
+        n = heapq.heappop(heap)[1]
+        ordered.append(nodes[n])
+        remaining -= 1
+        for m in succs[n]:
+            del preds[m][n]
+            if not preds[m]:
+                heapq.heappush(heap, (order[m], m))
+
+    # a folder is only created upfront if no row moves/copies/deletes anything at or above it
+    touched = {key for key in dst_keys if key} | {src_keys[i] for i, row in enumerate(rows) if row[0] in vacates}
+    folders = dict()
+    for i, (action, src, dst) in enumerate(rows):
+        if dst_keys[i] and action != ACTION_DELETE:
+            folder = os.path.dirname(dst)
+            if folder and folder not in folders:
+                key = os.path.dirname(dst_keys[i])
+                parent = key
+                while parent not in touched and os.path.dirname(parent) != parent:
+                    parent = os.path.dirname(parent)
+                folders[folder] = key if parent not in touched else None
+
+    keys = {key for key in folders.values() if key is not None}
+    parents = set()
+    for key in keys:
+        parent = os.path.dirname(key)
+        while parent not in parents and os.path.dirname(parent) != parent:
+            parents.add(parent)
+            parent = os.path.dirname(parent)
+    folders = [folder for folder, key in folders.items() if key is not None and key not in parents]
+
+    return ActionPlan(ordered, folders, conflicts)
+
+
+class ExecutionJournal:
+    """
+    Append-only journal of execute_actions, one JSON line [status, action, src, dst] per executed row.
+    Lines are written in batches of batch_size rows (and on flush/close), each batch followed by an os.fsync
+    when fsync=True, so a crash loses the status of at most the last batch_size rows. On resume, the rows
+    lost are taken as done when their effect is there (a move whose src is gone and dst exists, a delete
+    whose src is gone), and executed again otherwise.
+    That can't be told apart for rows sharing a path with other rows (chains, swaps, ...), so those are journaled
+    STATUS_STARTED (written right away) before they run, and are done when a later row sharing their path started.
+
+    execute_actions(rows, ACTION_MOVE, is_dryrun=False, journal=ExecutionJournal("move.journal"), resume=True)
+    """
+    STATUS_DONE = "DONE"
+    STATUS_FAILED = "FAILED"
+    STATUS_STARTED = "STARTED"
+
+    def __init__(self, filename: str, batch_size: int = 1000, fsync: bool = True):
+        self.filename = filename
+        self.batch_size = batch_size
+        self.fsync = fsync
+        self._lines = list()
+        self._file = None
+        self._completed = None
+        self._started = None
+        self._first_use = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _load(self):
+        self._completed = set()
+        self._started = set()
+        self._first_use = dict()
+        if os.path.exists(self.filename):
+            with open(self.filename, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        status, action, src, dst = json.loads(line)
+                    except ValueError:
+                        # last line may be incomplete after a crash
+                        continue
+                    row = (action, src, dst)
+                    self._first_use.setdefault(src, True)
+                    if dst:
+                        self._first_use.setdefault(dst, False)
+                    self._completed.discard(row)
+                    self._started.discard(row)
+                    if status == self.STATUS_DONE:
+                        self._completed.add(row)
+                    elif status == self.STATUS_STARTED:
+                        self._started.add(row)
+
+    def completed(self) -> set:
+        """
+        set of (action, src, dst) whose last journaled status is STATUS_DONE
+        """
+        if self._completed is None:
+            self._load()
+        return self._completed
+
+    def started(self) -> set:
+        """
+        set of (action, src, dst) whose last journaled status is STATUS_STARTED (interrupted, or their end lost)
+        """
+        if self._started is None:
+            self._load()
+        return self._started
+
+    def existed(self, path: str) -> bool:
+        """
+        whether path existed before the journaled rows ran: yes if the first one using it read it (src),
+        no if it wrote it (dst), os.path.lexists for the paths no journaled row used
+        """
+        if self._first_use is None:
+            self._load()
+        existed = self._first_use.get(path)
+        return os.path.lexists(path) if existed is None else existed
+
+    def start(self, rows: Iterable[tuple]):
+        """
+        journal rows as STATUS_STARTED, flushed before returning (before they are run)
+        """
+        for row in rows:
+            self._lines.append(json.dumps([self.STATUS_STARTED, *row], ensure_ascii=False) + "\n")
+            if self._started is not None:
+                self._started.add(tuple(row))
+        return self.flush()
+
+    def record(self, row: tuple, error: Exception = None):
+        status = self.STATUS_DONE if error is None else self.STATUS_FAILED
+        self._lines.append(json.dumps([status, *row], ensure_ascii=False) + "\n")
+
+        if self._completed is not None:
+            self._started.discard(tuple(row))
+            if error is None:
+                self._completed.add(tuple(row))
+            else:
+                self._completed.discard(tuple(row))
+
+        if len(self._lines) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if self._lines:
+            if self._file is None:
+                self._file = open(self.filename, "a", encoding="utf-8")
+            self._file.write("".join(self._lines))
+            self._file.flush()
+            if self.fsync:
+                os.fsync(self._file.fileno())
+            self._lines = list()
+        return self
+
+    def close(self):
+        self.flush()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def _row_paths(action: str, src: str, dst: str) -> tuple:
+    # (paths read, paths written or removed) by a row
+    if action in (ACTION_MOVE, ACTION_RENAME, ACTION_MOVE_FOLDER):
+        return {src}, {src, dst}
+    if action in (ACTION_DELETE, ACTION_REMOVE_FOLDER):
+        return {src}, {src}
+    return {src}, {dst}
+
+
+def _linked_rows(rows: List[tuple]) -> set:
+    # rows sharing a path with another row, their order matters (see ExecutionJournal)
+    counts = dict()
+    for action, src, dst in rows:
+        for path in {src, dst} - {""}:
+            counts[path] = counts.get(path, 0) + 1
+    return {row for row in rows if counts.get(row[1], 0) > 1 or counts.get(row[2], 0) > 1}
+
+
+def _applied_rows(rows: List[tuple], journal: ExecutionJournal, linked: set) -> set:
+    """
+    The rows that already ran, but whose journal line was lost in a crash (a move can't run twice).
+    Walking backwards, a row is done when a later row depending on it (sharing a path, one of them writing it)
+    is done or started, else for a move/delete when its src is gone (and dst exists), unless linked and not started.
+    """
+    completed = journal.completed()
+    started = journal.started()
+    later_reads = set()
+    later_writes = set()
+    applied = set()
+
+    for row in reversed(rows):
+        action, src, dst = row
+        reads, writes = _row_paths(*row)
+        if row in completed or not writes.isdisjoint(later_reads) or not writes.isdisjoint(later_writes) or not reads.isdisjoint(later_writes):
+            done = True
+        elif row in linked and row not in started:
+            done = False
+        elif action in (ACTION_MOVE, ACTION_RENAME, ACTION_MOVE_FOLDER):
+            done = not os.path.lexists(src) and os.path.lexists(dst)
+        elif action in (ACTION_DELETE, ACTION_REMOVE_FOLDER):
+            done = not os.path.lexists(src)
+        else:
+            done = False
+
+        if done or row in started:
+            later_reads |= reads
+            later_writes |= writes
+        if done:
+            applied.add(row)
+
+    return applied - completed
+
+
+def execute_actions(list_of_fpn_files: List[tuple],
+                    action: str = "",
+                    callback_on_error: callable = None,
+                    callback_on_progress: callable = None,
+                    is_dryrun: bool = True,
+                    workers: int = 0,
+                    preserve_metadata: str = PRESERVE_ALL,
+                    journal: ExecutionJournal = None,
+                    resume: bool = False,
+                    on_collision: str = ON_COLLISION_REPORT,
+                    check_existing: bool = False):
+    """
+    action = ("MOVE", "RENAME", "COPY", "DELETE", "RMDIR", "MOVEDIR")
+    list_of_fpn_files = [(src, dst, action) or (src, dst) or "src", ...]
+    callback_on_error = func(sender, [action, src, dst, exception])
+    callback_on_progress = func(sender, [total, current, action, src, dst, bytes copied])
+    rows are run in the order of plan_actions (chains/swaps made safe, destination folders created upfront)
+    workers > 1 runs independent actions concurrently on a thread pool (see _execution_waves), callbacks stay on the calling thread
+    preserve_metadata = metadata kept on COPY, and on MOVE across devices (see copy_file)
+    journal = ExecutionJournal (or its filename) where each executed row is recorded
+    resume = skip the rows the journal has as done (failed ones are retried), and the rows already applied
+             but not journaled before a crash (src gone and dst there for moves, src gone for deletes)
+    on_collision = ON_COLLISION_REPORT (callback_on_error of each colliding/overwriting row, and run anyway) or
+                   ON_COLLISION_RAISE (ValueError before running anything), see plan_actions conflicts
+    check_existing = also treat writing over an existing path (not moved away first) as a conflict
+    """
+    if not list_of_fpn_files:
+        return
+    
+    if not isinstance(list_of_fpn_files, list) or not isinstance(list_of_fpn_files[0], (list, tuple, str)):
+        raise ValueError(f"'list_of_fpn_files' parameter must be of [(src, dst, action) or (src, dst) or 'src', ...]")
+
+    if isinstance(journal, str):
+        with ExecutionJournal(journal) as journal:
+            return execute_actions(list_of_fpn_files, action=action, callback_on_error=callback_on_error, callback_on_progress=callback_on_progress, is_dryrun=is_dryrun, workers=workers, preserve_metadata=preserve_metadata, journal=journal, resume=resume, on_collision=on_collision, check_existing=check_existing)
+
+    if on_collision not in (ON_COLLISION_REPORT, ON_COLLISION_RAISE):
+        raise ValueError(f"on_collision must be one of {(ON_COLLISION_REPORT, ON_COLLISION_RAISE)}")
+
+    sender = "EXECUTE_ACTIONS"
+    with _phase("plan_actions"):
+        exists = journal.existed if journal is not None and resume else os.path.lexists
+        plan = plan_actions(_decode_actions(list_of_fpn_files, action), check_existing=check_existing, exists=exists)
+    rows = plan.rows
+
+    # chains and swaps are made safe by the plan order, collisions and overwrites are not
+    unsafe = [(row, conflict) for row, conflict in plan.conflicts if conflict in (CONFLICT_COLLISION, CONFLICT_OVERWRITE)]
+    if unsafe and on_collision == ON_COLLISION_RAISE:
+        (action, src, dst), conflict = unsafe[0]
+        raise ValueError(f"{len(unsafe)} destination conflicts found, ex: {conflict} on {src} -> {dst}")
+    if callback_on_error:
+        for (action, src, dst), conflict in unsafe:
+            callback_on_error(sender, [action, src, dst, ValueError(f"destination {conflict}")])
+
+    linked = _linked_rows(rows) if journal is not None else set()
+
+    # after planning, so the temporary rows of a cycle interrupted halfway are resumed too
+    if journal is not None and resume:
+        completed = journal.completed()
+        applied = _applied_rows(rows, journal, linked)
+        if not is_dryrun:
+            for row in rows:
+                if row in applied:
+                    journal.record(row)
+        rows = [row for row in rows if row not in completed and row not in applied]
+
+    created_folders = set()
+    total = len(rows)
     current = 0
 
-    res2 = list()
-    for fpn in list_of_fpn_files:
+    def _make_folders(folders):
+        # all destination folders in one batch, the ones failing are retried (and reported) by their rows
+        for folder in folders:
+            try:
+                with _phase("mkdir"):
+                    os.makedirs(folder, exist_ok=True)
+                _count("mkdir")
+            except OSError:
+                continue
+
+            while folder and folder not in created_folders:
+                created_folders.add(folder)
+                folder, parent = os.path.dirname(folder), folder
+                if folder == parent:
+                    break
+
+    def _make_sure_folder_exists(action, dst):
+        if action != ACTION_DELETE and dst:
+            folder = os.path.dirname(dst)
+            if folder and folder not in created_folders:
+                # makedirs with exist_ok is safe when several threads create the same folder
+                with _phase("mkdir"):
+                    os.makedirs(folder, exist_ok=True)
+                _count("mkdir")
+                created_folders.add(folder)
+
+    def _execute(action, src, dst) -> int:
+        # returns the number of bytes copied
+        if action == ACTION_COPY:
+            return _copy_file(src, dst, preserve_metadata)[1]
+        elif action == ACTION_DELETE:
+            _count("remove")
+            os.remove(src)
+        elif action == ACTION_REMOVE_FOLDER:
+            _count("rmdir")
+            os.rmdir(src)
+        elif action in [ACTION_MOVE, ACTION_RENAME, ACTION_MOVE_FOLDER]:
+            move_file(src, dst, preserve_metadata)
+        return 0
+
+    def _run(row):
+        stats = _stats_var.get()
+        start = time.perf_counter() if stats is not None else 0
+        try:
+            _make_sure_folder_exists(row[0], row[2])
+            result = row, None, _execute(*row)
+        except Exception as e:
+            result = row, e, 0
+
+        if stats is not None:
+            stats.observe(row[0], time.perf_counter() - start, result[2])
+        return result
+
+    def _report(row, error, size):
+        nonlocal current
         current += 1
+        action, src, dst = row
+
+        if journal is not None and not is_dryrun:
+            journal.record(row, error)
+
+        if error is not None and callback_on_error:
+            callback_on_error(sender, [action, src, dst, error])
+
+        if callback_on_progress:
+            callback_on_progress(sender, [total, current, action, src, dst, size])
+
+    try:
+        if is_dryrun:
+            for row in rows:
+                _report(row, None, 0)
+            return
+
+        _make_folders(plan.folders)
+        if workers and workers > 1:
+            _run_bound = _bind_stats(_run)
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                for wave in _execution_waves(rows):
+                    if linked:
+                        journal.start(row for row in wave if row in linked)
+                    for future in as_completed([pool.submit(_run_bound, row) for row in wave]):
+                        _report(*future.result())
+        else:
+            for row in rows:
+                if row in linked:
+                    journal.start([row])
+                _report(*_run(row))
+    finally:
+        if journal is not None:
+            journal.flush()
+
+
+def remove_empty_folders(path: str,
+                         callback_on_error: callable = None,
+                         callback_on_progress: callable = None,
+                         workers: int = 0):
+    empty_folders = list_empty_folders(path, workers=workers)
+    execute_actions(empty_folders, action=ACTION_REMOVE_FOLDER, callback_on_error=callback_on_error, callback_on_progress=callback_on_progress, workers=workers)
+
+
+def _hash_file(fpn: str, size: int, partial_size: int = 0) -> bytes:
+    """
+    blake2b of the whole file, or only of its first and last partial_size bytes when partial_size > 0
+    """
+    h = hashlib.blake2b(digest_size=20)
+    _count("hash")
+    with open(fpn, "rb") as f:
+        if partial_size:
+            h.update(f.read(partial_size))
+            if size > partial_size:
+                f.seek(max(partial_size, size - partial_size))
+                h.update(f.read(partial_size))
+        else:
+            for chunk in iter(lambda: f.read(_HASH_CHUNK_SIZE), b""):
+                h.update(chunk)
+    return h.digest()
+
+
+def find_duplicate_files(list_of_fpn_sizes: List[tuple],
+                         workers: int = 4,
+                         partial_size: int = 4096,
+                         callback_on_error: callable = None,
+                         callback_on_progress: callable = None) -> List[int]:
+    """
+    list_of_fpn_sizes = [(fpn, size), ...]
+    returns the duplicate group of each file (same content = same group number), -1 for the unique ones.
+    Only files with the same size are hashed, first on their first+last partial_size bytes, and only the ones
+    still matching are fully hashed, on a pool of 'workers' threads.
+    """
+    sender = "FIND_DUPLICATES"
+    keys = [None] * len(list_of_fpn_sizes)
+
+    def _candidates(groups):
+        return [i for group in groups.values() if len(group) > 1 for i in group]
 
+    def _hash(index, hash_size):
+        fpn, size = list_of_fpn_sizes[index]
         try:
-            folder, filename = os.path.split(fpn)
-            rpath = fpn[relative_path:].lstrip(os.sep)
-            rfolder = folder[relative_path:].lstrip(os.sep)
-            name, extension = os.path.splitext(filename)
-            is_file = os.path.isfile(fpn)
-            stat = os.stat(fpn)
-            filesize = stat.st_size
-            md_time = datetime.fromtimestamp(stat.st_mtime)
-            cr_time = datetime.fromtimestamp(stat.st_ctime)
-
-            attr = (fpn, folder, rpath, rfolder, filename, name, extension[1:], filesize, md_time, cr_time, is_file)
-            res2.append(attr)
+            return index, _hash_file(fpn, size, hash_size), None
         except Exception as e:
-            filesize = -1
-            if callback_on_error:
-                callback_on_error(sender, [fpn, e])
+            return index, None, e
+
+    # 1st: group by size, all empty files are equal
+    groups = dict()
+    for i, (fpn, size) in enumerate(list_of_fpn_sizes):
+        groups.setdefault((size,), list()).append(i)
+    candidates = _candidates(groups)
+
+    total = current = 0
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        # 2nd: partial hash (that is already the full hash for files up to 2 * partial_size), 3rd: full hash
+        for hash_size, is_needed in ((partial_size, lambda size: size > 0), (0, lambda size: size > 2 * partial_size)):
+            to_hash = [i for i in candidates if is_needed(list_of_fpn_sizes[i][1])]
+            total += len(to_hash)
+            for index, digest, error in _ordered_map(pool, lambda i: _hash(i, hash_size), to_hash, window=max(1, workers) * 16):
+                current += 1
+                fpn, size = list_of_fpn_sizes[index]
+                if error is None:
+                    keys[index] = digest
+                else:
+                    keys[index] = error
+                    if callback_on_error:
+                        callback_on_error(sender, [fpn, error])
+                if callback_on_progress:
+                    callback_on_progress(sender, [total, current, fpn, size])
+
+            groups = dict()
+            for i in candidates:
+                if not isinstance(keys[i], Exception):
+                    groups.setdefault((list_of_fpn_sizes[i][1], keys[i]), list()).append(i)
+            candidates = _candidates(groups)
+
+    result = [-1] * len(list_of_fpn_sizes)
+    group_number = 0
+    for group in sorted((group for group in groups.values() if len(group) > 1), key=min):
+        for i in group:
+            result[i] = group_number
+        group_number += 1
+
+    return result
+
+
+def _df_list_based_on_action(df: pd.DataFrame, action: str = "") -> list:
+    if action == "":
+        pass
+    elif action in [ACTION_MOVE_FOLDER, ACTION_REMOVE_FOLDER]:
+        df = df[df[HEADER_IS_FILE] == False]
+    else:
+        df = df[df[HEADER_IS_FILE] == True]
+        df = df.sort_values(by=[HEADER_TARGET_FPN])
+
+    if action in (ACTION_DELETE, ACTION_REMOVE_FOLDER):
+        df = df[HEADER_SOURCE_FPN]
+    else:
+        df = df[[HEADER_SOURCE_FPN, HEADER_TARGET_FPN]]
+
+    return df.values.tolist()
+
+
+def _path_keys(series: pd.Series) -> pd.Series:
+    # object dtype, as hashing (isin/duplicated) is much faster than on arrow backed strings
+    if os.path.normcase("A/") != "A/":
+        series = series.str.lower().str.replace("/", "\\", regex=False)
+    return series.astype(object)
+
+
+def _regex_replace(series: pd.Series, regex: re.Pattern, replacement: str) -> pd.Series:
+    # python re by default, RE2 (pyarrow) only for the syntax both read the same (see _ARROW_SAFE_PATTERN), a pattern
+    # that can't match empty, a replacement only using \1-\9 groups (\0 is the whole match in RE2) and no newline
+    # in the values (python's $ also matches before a final one)
+    if (pc is not None and not regex.flags & ~re.UNICODE and regex.search("") is None
+            and _ARROW_SAFE_PATTERN.fullmatch(regex.pattern) and _ARROW_SAFE_REPLACEMENT.fullmatch(replacement)
+            and not series.str.contains("\n", regex=False).any()):
+        try:
+            result = pc.replace_substring_regex(pa.array(series, type=pa.string()), regex.pattern, replacement)
+            return pd.Series(result.to_pandas(), index=series.index, dtype=series.dtype)
+        except (pa.ArrowInvalid, UnicodeEncodeError):
+            pass
+
+    return series.str.replace(regex, replacement, regex=True)
+
+
+def plan_output(df: pd.DataFrame,
+                dst_folder: str,
+                keep_source_folder_structure: bool,
+                src_regex: str = "",
+                dst_regex: str = "") -> pd.Series:
+    """
+    Compute the dst_fpn of every row of df (HEADER columns), renaming the filename with src_regex -> dst_regex.
+    The regex is compiled once, and applied with pyarrow string kernels when available and equivalent.
+    """
+    # rename files
+    if src_regex and dst_regex:
+        dst_fpn = _regex_replace(df[REGEX_RENAME_BASED_ON_FIELD], re.compile(src_regex), dst_regex)
+    else:
+        dst_fpn = df[REGEX_RENAME_BASED_ON_FIELD]
+
+    # remove ending separator
+    dst_folder = dst_folder.rstrip(os.sep) + os.sep
+
+    # create destination full-path-name
+    if keep_source_folder_structure:
+        rfolder = df[HEADER_RELATIVE_FOLDER]
+        if isinstance(rfolder.dtype, pd.CategoricalDtype):
+            # compact df: build the prefix once per distinct folder
+            return rfolder.cat.rename_categories(lambda folder: dst_folder + folder + os.sep if folder else dst_folder).astype(str) + dst_fpn
+        return (dst_folder + rfolder + os.sep).where(rfolder != "", dst_folder) + dst_fpn
+
+    return dst_folder + dst_fpn
+
+
+def find_conflicts(fpn: pd.Series, dst_fpn: pd.Series) -> pd.Series:
+    """
+    Label rows whose destination is not safe to execute blindly:
+    CONFLICT_COLLISION = two or more rows with the same destination
+    CONFLICT_CHAIN = the destination is the source of another row (A->B while B->C)
+    CONFLICT_SWAP = two rows exchange their paths (A->B, B->A)
+    Chains and swaps are executed in a safe order by execute_actions (see plan_actions), collisions are not.
+    """
+    src_key = _path_keys(fpn)
+    dst_key = _path_keys(dst_fpn)
+
+    conflicts = pd.Series("", index=fpn.index, dtype=object)
+    chain = dst_key.isin(src_key) & (dst_key != src_key)
+    conflicts[chain] = CONFLICT_CHAIN
+
+    # both rows of a swap are chained, so only those are paired
+    if chain.any():
+        chained = list(zip(src_key[chain], dst_key[chain]))
+        pairs = set(chained)
+        conflicts[chain[chain].index[[(dst, src) in pairs for src, dst in chained]]] = CONFLICT_SWAP
+    conflicts[dst_key.duplicated(keep=False)] = CONFLICT_COLLISION
+
+    return conflicts
+
+
+def resolve_collisions(dst_fpn: pd.Series) -> pd.Series:
+    """
+    Keep the first row of each colliding destination, append ' (n)' to the name of the others
+    """
+    dst_fpn = dst_fpn.copy()
+    while True:
+        key = _path_keys(dst_fpn)
+        duplicated = key.duplicated(keep="first")
+        if not duplicated.any():
+            return dst_fpn
+
+        counter = key[key.duplicated(keep=False)].groupby(key).cumcount()[duplicated]
+        split = dst_fpn[duplicated].str.extract(r"^(.*?)((?:\.[^.\\/]*)?)$")
+        dst_fpn[duplicated] = split[0] + " (" + counter.astype(str) + ")" + split[1]
+
+
+def _generate_output(df: pd.DataFrame,
+                     dst_folder: str,
+                     keep_source_folder_structure: bool,
+                     src_regex: str = "",
+                     dst_regex: str = "",
+                     on_collision: str = ON_COLLISION_REPORT,
+                     callback_on_error: callable = None) -> pd.DataFrame:
+    if on_collision not in ON_COLLISIONS:
+        raise ValueError(f"on_collision must be one of {ON_COLLISIONS}")
+
+    with _phase("plan"):
+        dst_fpn = plan_output(df, dst_folder, keep_source_folder_structure, src_regex, dst_regex)
+        if on_collision == ON_COLLISION_RENAME:
+            dst_fpn = resolve_collisions(dst_fpn)
+
+    with _phase("conflicts"):
+        conflicts = find_conflicts(df[HEADER_SOURCE_FPN], dst_fpn)
+    df[HEADER_TARGET_FPN] = dst_fpn
+
+    conflicts = pd.DataFrame({HEADER_SOURCE_FPN: df[HEADER_SOURCE_FPN], HEADER_TARGET_FPN: dst_fpn, HEADER_CONFLICT: conflicts})[conflicts != ""]
+
+    # chains and swaps are made safe by the execution order (see plan_actions), as in execute_actions
+    collisions = conflicts[conflicts[HEADER_CONFLICT] == CONFLICT_COLLISION]
+    if len(collisions):
+        if on_collision == ON_COLLISION_RAISE:
+            first = collisions.iloc[0]
+            raise ValueError(f"{len(collisions)} destination conflicts found, ex: {first[HEADER_CONFLICT]} on {first[HEADER_SOURCE_FPN]} -> {first[HEADER_TARGET_FPN]}")
+
+        if callback_on_error:
+            for src, dst, conflict in collisions.values.tolist():
+                callback_on_error("GENERATE_OUTPUT", [src, dst, ValueError(f"destination {conflict}")])
+
+    return conflicts
+
+
+def _file_format(filename: str) -> str:
+    ext = os.path.splitext(filename)[1].lower()
+    if ext in (".parquet", ".pq"):
+        return FORMAT_PARQUET
+    if ext in (".feather", ".arrow", ".ipc"):
+        return FORMAT_FEATHER
+    return FORMAT_CSV
+
+
+def _require_pyarrow(file_format: str):
+    if pa is None:
+        raise ImportError(f"pyarrow is required to read/write {file_format} files (pip install pyarrow)")
+
 
-        if callback_on_progress:
-            callback_on_progress(sender, [total, current, fpn, filesize])
+def read_file(filename: str) -> pd.DataFrame:
+    """
+    Read a file written by FiReMan.save_to_csv/save_to_parquet/save_to_feather (format by extension)
+    """
+    file_format = _file_format(filename)
+    if file_format == FORMAT_PARQUET:
+        _require_pyarrow(file_format)
+        return pd.read_parquet(filename)
+    if file_format == FORMAT_FEATHER:
+        _require_pyarrow(file_format)
+        return pd.read_feather(filename)
+
+    # path/name columns stay strings, even when they look like numbers (ex: a folder named 2021)
+    columns = pd.read_csv(filename, nrows=0).columns
+    dtype = {col_name: str for col_name in columns if col_name not in ("size", "mtime", "ctime", HEADER_IS_FILE, HEADER_DUPLICATE_GROUP)}
+    return pd.read_csv(filename, dtype=dtype, keep_default_na=False, parse_dates=[col_name for col_name in ("mtime", "ctime") if col_name in columns])
 
-    return res2
 
+def read_actions(filename: str, batch_size: int = 100000) -> Tuple[int, Iterator[list]]:
+    """
+    Read only the CSV_HEADERS columns of filename (csv, parquet or feather, by extension) in batches of rows.
+    returns (total number of rows, iterator of [[src, dst, action], ...])
+    The rows of a csv are counted with a first pass reading only its action column.
+    """
+    file_format = _file_format(filename)
 
-def list_empty_folders(path: str) -> list:
-    # get all files under path and save only the foldername (the occupied ones, by files)
-    files = list_files(path, include_full_path_name=True, include_files=True, include_folders=False, include_sub_folders=True)
-    files = list({os.path.dirname(file) for file in files})
+    if file_format == FORMAT_CSV:
+        columns = pd.read_csv(filename, nrows=0).columns
+    else:
+        _require_pyarrow(file_format)
+        if file_format == FORMAT_PARQUET:
+            reader = pq.ParquetFile(filename)
+            columns = reader.schema_arrow.names
+        else:
+            reader = pa.ipc.open_file(pa.memory_map(filename))
+            columns = reader.schema.names
 
-    # list of all folders under same path
-    folders = list_folders(path)
+    for col_name in CSV_HEADERS:
+        if col_name not in columns:
+            raise ValueError(f"Expected header of {filename} to have {CSV_HEADERS}. Missing {col_name}")
 
-    # check if folders belong to files
-    empty_folders = set()
-    for folder in folders:
-        for busy_folder in files:
-            if busy_folder.startswith(folder):
-                break
+    def _batches():
+        if file_format == FORMAT_CSV:
+            with pd.read_csv(filename, usecols=CSV_HEADERS, dtype=str, keep_default_na=False, chunksize=batch_size) as chunks:
+                for df in chunks:
+                    yield df[CSV_HEADERS].values.tolist()
+        elif file_format == FORMAT_PARQUET:
+            for batch in reader.iter_batches(batch_size=batch_size, columns=CSV_HEADERS):
+                yield batch.to_pandas()[CSV_HEADERS].fillna("").values.tolist()
         else:
-            empty_folders.add(folder)
+            for i in range(reader.num_record_batches):
+                yield reader.get_batch(i).select(CSV_HEADERS).to_pandas().fillna("").values.tolist()
 
-    empty_folders = list(empty_folders)
-    empty_folders.sort(key=str.lower, reverse=True)
+    if file_format == FORMAT_CSV:
+        with pd.read_csv(filename, usecols=[HEADER_ACTION], dtype=str, keep_default_na=False, chunksize=batch_size) as chunks:
+            total = sum(len(df) for df in chunks)
+    elif file_format == FORMAT_PARQUET:
+        total = reader.metadata.num_rows
+    else:
+        total = sum(reader.get_batch(i).num_rows for i in range(reader.num_record_batches))
 
-    return empty_folders
+    return total, _batches()
 
 
-def execute_actions(list_of_fpn_files: List[tuple],
-                    action: str = "",
-                    callback_on_error: callable = None,
-                    callback_on_progress: callable = None,
-                    is_dryrun: bool = True):
+def _execute_batches(batches: Iterable[list], **kwargs):
     """
-    action = ("MOVE", "RENAME", "COPY", "DELETE", "RMDIR", "MOVEDIR")
-    list_of_fpn_files = [(src, dst, action) or (src, dst) or "src", ...]
-    callback_on_error = func(sender, data)
-    callback_on_progress = func(sender, data)
+    execute_actions over the rows of all the batches at once: they are planned together, so the chains, swaps and
+    collisions across batches are ordered (or reported) too. Only the rows are held, not the batches' DataFrames.
     """
-    if not list_of_fpn_files:
-        return
-    
-    if not isinstance(list_of_fpn_files, list) or not isinstance(list_of_fpn_files[0], (list, tuple, str)):
-        raise ValueError(f"'list_of_fpn_files' parameter must be of [(src, dst, action) or (src, dst) or 'src', ...]")
-
-    sender = "EXECUTE_ACTIONS"
-    last_folder = src = dst = ""
-    total = len(list_of_fpn_files)
-    current = 0
+    rows = list()
+    for batch in batches:
+        rows.extend(batch)
+    execute_actions(rows, **kwargs)
 
-    def _make_sure_folder_exists(lastfolder):
-        if action != ACTION_DELETE:
-            folder = os.path.dirname(dst)
-            if folder != lastfolder:
-                os.makedirs(folder, exist_ok=True)
-                return folder
-        return lastfolder
 
-    def _execute(action, src, dst):
-        if action == ACTION_COPY:
-            shutil.copy2(src, dst)
-            shutil.copystat(src, dst)
-        elif action == ACTION_DELETE:
-            os.remove(src)
-        elif action == ACTION_REMOVE_FOLDER:
-            os.rmdir(src)
-        elif action in [ACTION_MOVE, ACTION_RENAME, ACTION_MOVE_FOLDER]:
-            shutil.move(src, dst)
+def compact_df(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Compact copy of a FiReMan df: the derived columns (rpath, name) are dropped (see expand_df),
+    folder/rfolder/ext/action become categoricals and the other strings arrow strings (when pyarrow is available)
+    """
+    df = df.drop(columns=[col_name for col_name in _COMPACT_DERIVED_HEADERS if col_name in df.columns])
+    for col_name in df.columns:
+        if col_name in _COMPACT_CATEGORY_HEADERS:
+            df[col_name] = df[col_name].astype("category")
+        elif col_name in (HEADER_SOURCE_FPN, REGEX_RENAME_BASED_ON_FIELD, HEADER_TARGET_FPN):
+            df[col_name] = df[col_name].astype(_COMPACT_STRING_DTYPE)
+    return df
 
-    for row in list_of_fpn_files:
-        current += 1
 
-        # decode vars
-        if isinstance(row, str):
-            src = row
-        else:
-            if len(row) == 3:
-                src, dst, action = row
-            elif len(row) == 2:
-                src, dst = row
-            else:
-                raise ValueError(f"'list_of_fpn_files' parameter values not of valid type {type(row)}")
+def expand_df(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Add back the columns dropped by compact_df, in HEADER order (other columns go after)
+    """
+    if all(col_name in df.columns for col_name in _COMPACT_DERIVED_HEADERS):
+        return df
 
-        if not is_dryrun:
-            try:
-                last_folder = _make_sure_folder_exists(last_folder)
-                _execute(action, src, dst)
-            except Exception as e:
-                if callback_on_error:
-                    callback_on_error(sender, [action, src, dst, e])
+    df = df.copy()
+    filename = df[REGEX_RENAME_BASED_ON_FIELD].astype(object)
+    rfolder = df[HEADER_RELATIVE_FOLDER].astype(object)
+    df["rpath"] = (rfolder + os.sep).where(rfolder != "", "") + filename
+    df["name"] = [os.path.splitext(f)[0] for f in filename]
 
-        if callback_on_progress:
-            callback_on_progress(sender, [total, current, action, src, dst])
+    return df[[col_name for col_name in HEADER if col_name in df.columns] + [col_name for col_name in df.columns if col_name not in HEADER]]
 
 
-def remove_empty_folders(path: str,
-                         callback_on_error: callable = None,
-                         callback_on_progress: callable = None):
-    empty_folders = list_empty_folders(path)
-    execute_actions(empty_folders, action=ACTION_REMOVE_FOLDER, callback_on_error=callback_on_error, callback_on_progress=callback_on_progress)
+def _operation(method: callable) -> callable:
+    # activate FiReMan.stats (timing the whole operation as a phase), and forward the progress/errors
+    # still held by the ProgressThrottle when the operation ends (or fails)
+    @wraps(method)
+    def _method(self, *args, **kwargs):
+        try:
+            with self.stats or _NO_PHASE, _phase(method.__name__):
+                return method(self, *args, **kwargs)
+        finally:
+            if self.progress:
+                self.progress.flush()
+    return _method
 
 
 class FiReMan:
 
-    def __init__(self, callback_on_error: callable = None, callback_on_progress: callable = None) -> None:
+    def __init__(self, callback_on_error: callable = None, callback_on_progress: callable = None, compact: bool = False, progress_interval: float = 0.25, batch_errors: bool = False, instrument: bool = False) -> None:
+        """
+        compact = keep df in the compact_df representation (much less memory on big scans), use full_df() to get all HEADER columns
+        progress_interval = seconds between callback_on_progress calls (see ProgressThrottle), 0 to be called for every file
+        batch_errors = callback_on_error gets the list of errors since the last progress call, instead of one call per error
+        instrument = True (or a Stats, to share it) to collect in self.stats the timings/counters of every operation
+        """
         super().__init__()
+        self.stats = (Stats() if instrument is True else instrument) or None
+        self.progress = None
+        if progress_interval or batch_errors:
+            self.progress = ProgressThrottle(callback_on_progress, callback_on_error, interval=progress_interval, batch_errors=batch_errors)
+            callback_on_progress = self.progress.on_progress if callback_on_progress else None
+            callback_on_error = self.progress.on_error if callback_on_error else None
         self.callback_on_error = callback_on_error
         self.callback_on_progress = callback_on_progress
+        self.compact = compact
         self.df = pd.DataFrame([], columns=HEADER)
+        self.conflicts = pd.DataFrame([], columns=[HEADER_SOURCE_FPN, HEADER_TARGET_FPN, HEADER_CONFLICT])
 
-    def _append_df(self, fd: list):
-        df = pd.DataFrame(fd, columns=HEADER[:-2])
-        self.df = self.df.append(df, ignore_index=True)
-        self.df = self.df.drop_duplicates(subset=[HEADER_SOURCE_FPN], keep='first').fillna("", inplace=False)
+    def _rows_to_df(self, rows: list) -> pd.DataFrame:
+        df = pd.DataFrame(rows, columns=HEADER[:-2])
+        df[HEADER_TARGET_FPN] = ""
+        df[HEADER_ACTION] = ""
+        return compact_df(df) if self.compact else df
 
-    def _get_df_list_based_on_action(self, action: str = "") -> list:
-        if action == "":
-            df = self.df
-        elif action in [ACTION_MOVE_FOLDER, ACTION_REMOVE_FOLDER]:
-            df = self.df[self.df[HEADER_IS_FILE] == False]
-        else:
-            df = self.df[self.df[HEADER_IS_FILE] == True]
-            df.sort_values(by=[HEADER_TARGET_FPN], inplace=True)
+    @property
+    def df(self) -> pd.DataFrame:
+        # scanned rows are buffered by _append_df, and only turned into (one) DataFrame when first needed
+        if self._pending_rows or self._pending_frames:
+            with self.stats or _NO_PHASE, _phase("build_df"):
+                self._build_df()
+        return self._df
 
-        if action in (ACTION_DELETE, ACTION_REMOVE_FOLDER):
-            df = df[HEADER_SOURCE_FPN]
-        else:
-            df = df[[HEADER_SOURCE_FPN, HEADER_TARGET_FPN]]
+    @df.setter
+    def df(self, df: pd.DataFrame):
+        self._df = compact_df(df) if self.compact else df
+        self._pending_rows = list()
+        self._pending_frames = list()
+        self._fpn_index = None
+
+    def _build_df(self):
+        frames = ([self._df] if len(self._df) else []) + self._pending_frames + ([self._rows_to_df(self._pending_rows)] if self._pending_rows else [])
+        df = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+        self._pending_rows = list()
+        self._pending_frames = list()
+        if self.compact:
+            # concat of categoricals with different categories gives object columns, and the fpn strings are no longer shared
+            df = compact_df(df)
+            self._fpn_index = None
+        self._df = df
+
+    def _append_df(self, fd: Iterable[tuple]):
+        # hash index of the fpn already scanned, to drop duplicates without touching the DataFrame
+        if self._fpn_index is None:
+            self._fpn_index = set(self.df[HEADER_SOURCE_FPN])
+
+        for row in fd:
+            if row[0] not in self._fpn_index:
+                self._fpn_index.add(row[0])
+                self._pending_rows.append(row)
+
+                # in compact mode, do not hold more than a batch of row tuples
+                if self.compact and len(self._pending_rows) >= _COMPACT_BATCH_SIZE:
+                    self._pending_frames.append(self._rows_to_df(self._pending_rows))
+                    self._pending_rows = list()
+
+    def _append_frame(self, df: pd.DataFrame):
+        # same as _append_df, for a DataFrame with the HEADER[:-2] columns
+        if self._fpn_index is None:
+            self._fpn_index = set(self.df[HEADER_SOURCE_FPN])
+
+        # keep the scan order, rows already buffered go first
+        if self._pending_rows:
+            self._pending_frames.append(self._rows_to_df(self._pending_rows))
+            self._pending_rows = list()
 
-        return df.values.tolist()
+        fpn = df[HEADER_SOURCE_FPN].tolist()
+        is_new = [f not in self._fpn_index for f in fpn]
+        if not all(is_new):
+            df = df[is_new].reset_index(drop=True)
+            fpn = df[HEADER_SOURCE_FPN].tolist()
+        if not len(df):
+            return
+
+        self._fpn_index.update(fpn)
+        df[HEADER_TARGET_FPN] = ""
+        df[HEADER_ACTION] = ""
+        self._pending_frames.append(compact_df(df) if self.compact else df)
+
+    def full_df(self) -> pd.DataFrame:
+        return expand_df(self.df) if self.compact else self.df
+
+    def _get_df_list_based_on_action(self, action: str = "") -> list:
+        return _df_list_based_on_action(self.df, action)
 
     def reset(self):
         self.df = pd.DataFrame([], columns=HEADER)
         return self
 
+    def stream(self, chunk_size: int = 10000):
+        if self.progress:
+            return FiReManStream(callback_on_error=self.progress.callback_on_error, callback_on_progress=self.progress.callback_on_progress, chunk_size=chunk_size,
+                                 progress_interval=self.progress.interval, batch_errors=self.progress.batch_errors)
+        return FiReManStream(callback_on_error=self.callback_on_error, callback_on_progress=self.callback_on_progress, chunk_size=chunk_size, progress_interval=0)
+
+    @_operation
     def scan_folder(self, path: str, 
                     include_files: bool = True,
                     include_folders: bool = False,
                     include_sub_folders: bool = True,
-                    filename_regex_filter: str = ""):
-        files = list_files(path, include_full_path_name=True, include_files=include_files, include_folders=include_folders, include_sub_folders=include_sub_folders, filename_regex_filter=filename_regex_filter)
-        fd = list_file_details(files, path, callback_on_error=self.callback_on_error, callback_on_progress=self.callback_on_progress)
+                    filename_regex_filter: str = "",
+                    workers: int = 0,
+                    cache: ScanCache = None,
+                    scan_filter: ScanFilter = None,
+                    check_cancelled: callable = None):
+        fd = scan_file_details(path, include_files=include_files, include_folders=include_folders, include_sub_folders=include_sub_folders, filename_regex_filter=filename_regex_filter, callback_on_error=self.callback_on_error, callback_on_progress=self.callback_on_progress, workers=workers, cache=cache, scan_filter=scan_filter, check_cancelled=check_cancelled)
         self._append_df(fd)
         return self
 
-    def scan_empty_folders(self, path: str):
-        empty_folders = list_empty_folders(path)
-        fd = list_file_details(empty_folders, path, callback_on_error=self.callback_on_error, callback_on_progress=self.callback_on_progress)
+    @_operation
+    def scan_folders(self, paths: Iterable[str],
+                     include_files: bool = True,
+                     include_folders: bool = False,
+                     include_sub_folders: bool = True,
+                     filename_regex_filter: str = "",
+                     processes: int = 0,
+                     workers: int = 0,
+                     scan_filter: ScanFilter = None):
+        """
+        scan_folder of several paths (or sub-folders of one) on a pool of processes, see iter_scan_folders
+        """
+        for df in iter_scan_folders(paths, include_files=include_files, include_folders=include_folders, include_sub_folders=include_sub_folders, filename_regex_filter=filename_regex_filter, callback_on_error=self.callback_on_error, callback_on_progress=self.callback_on_progress, processes=processes, workers=workers, scan_filter=scan_filter):
+            self._append_frame(df)
+        return self
+
+    @_operation
+    def scan_empty_folders(self, path: str, workers: int = 0):
+        empty_folders = list_empty_folders(path, workers=workers)
+        fd = list_file_details(empty_folders, path, callback_on_error=self.callback_on_error, callback_on_progress=self.callback_on_progress, workers=workers)
         self._append_df(fd)
         return self
 
+    @_operation
     def generate_output(self,
                         dst_folder: str,
                         keep_source_folder_structure: bool,
                         src_regex: str = "",
-                        dst_regex: str = ""):
-        # rename files
-        if src_regex and dst_regex:
-            self.df[HEADER_TARGET_FPN] = self.df[REGEX_RENAME_BASED_ON_FIELD].str.replace(src_regex, dst_regex, regex=True)
-        else:
-            self.df[HEADER_TARGET_FPN] = self.df[REGEX_RENAME_BASED_ON_FIELD]
-        
-        # remove ending separator
-        dst_folder = dst_folder.rstrip(os.sep)
-
-        # create destination full-path-name
-        if keep_source_folder_structure:
-            self.df[HEADER_TARGET_FPN] = dst_folder + os.sep + self.df[HEADER_RELATIVE_FOLDER] + os.sep + self.df[HEADER_TARGET_FPN]
-            self.df[HEADER_TARGET_FPN] = self.df[HEADER_TARGET_FPN].str.replace(os.sep*2, os.sep, case=True, regex=False)
-        else:
-            self.df[HEADER_TARGET_FPN] = dst_folder + os.sep + self.df[HEADER_TARGET_FPN]
-        
+                        dst_regex: str = "",
+                        on_collision: str = ON_COLLISION_REPORT):
+        """
+        on_collision = what to do when 2 rows get the same dst_fpn
+            ON_COLLISION_REPORT: callback_on_error for each conflicting row (ON_COLLISION_RAISE: ValueError)
+            ON_COLLISION_RENAME: keep the 1st, add ' (n)' to the name of the others
+        conflicts (collisions, chains and swaps, see find_conflicts) are kept in self.conflicts, only collisions are
+        reported/raised: chains and swaps are ordered safely by execute
+        """
+        self.conflicts = _generate_output(self.df, dst_folder, keep_source_folder_structure, src_regex, dst_regex, on_collision, self.callback_on_error)
+        return self
+
+    @_operation
+    def find_duplicates(self, keep: str = "", workers: int = 4, partial_size: int = 4096):
+        """
+        Add the HEADER_DUPLICATE_GROUP column (see find_duplicate_files) for the scanned files.
+        keep = "" only adds the column, else the df is reduced to the redundant copies of each group, keeping
+            out the KEEP_FIRST, KEEP_LAST, KEEP_OLDEST or KEEP_NEWEST (mtime) one, ready for execute(ACTION_DELETE)
+        """
+        if keep and keep not in KEEPS:
+            raise ValueError(f"keep must be one of {KEEPS}")
+
+        df = self.df
+        files = df[df[HEADER_IS_FILE] == True]
+        groups = find_duplicate_files(list(zip(files[HEADER_SOURCE_FPN], files["size"])), workers=workers, partial_size=partial_size, callback_on_error=self.callback_on_error, callback_on_progress=self.callback_on_progress)
+        df[HEADER_DUPLICATE_GROUP] = pd.Series(groups, index=files.index, dtype="int64").reindex(df.index, fill_value=-1)
+
+        if keep:
+            duplicates = df[df[HEADER_DUPLICATE_GROUP] >= 0]
+            if keep in (KEEP_OLDEST, KEEP_NEWEST):
+                duplicates = duplicates.sort_values(by="mtime", kind="stable", ascending=keep == KEEP_OLDEST)
+            kept = duplicates.drop_duplicates(subset=[HEADER_DUPLICATE_GROUP], keep="last" if keep == KEEP_LAST else "first")
+            self.df = df[(df[HEADER_DUPLICATE_GROUP] >= 0) & ~df.index.isin(kept.index)]
+
         return self
 
-    def execute(self, action: str, is_dryrun: bool = True):
+    @_operation
+    def execute(self, action: str, is_dryrun: bool = True, workers: int = 0, preserve_metadata: str = PRESERVE_ALL, journal: ExecutionJournal = None, resume: bool = False, on_collision: str = ON_COLLISION_REPORT, check_existing: bool = False):
         if action not in ACTIONS:
             raise ValueError(f"Action must be one of {ACTIONS}")
 
-        execute_actions(self._get_df_list_based_on_action(action), action=action, callback_on_error=self.callback_on_error, callback_on_progress=self.callback_on_progress, is_dryrun=is_dryrun)
+        execute_actions(self._get_df_list_based_on_action(action), action=action, callback_on_error=self.callback_on_error, callback_on_progress=self.callback_on_progress, is_dryrun=is_dryrun, workers=workers, preserve_metadata=preserve_metadata, journal=journal, resume=resume, on_collision=on_collision, check_existing=check_existing)
+        return self
+
+    def execute_from_csv(self, filename: str, is_dryrun: bool = True, workers: int = 0, preserve_metadata: str = PRESERVE_ALL, journal: ExecutionJournal = None, resume: bool = False, on_collision: str = ON_COLLISION_REPORT, check_existing: bool = False):
+        return self.execute_from_file(filename, is_dryrun=is_dryrun, workers=workers, preserve_metadata=preserve_metadata, journal=journal, resume=resume, on_collision=on_collision, check_existing=check_existing)
+
+    @_operation
+    def execute_from_file(self, filename: str, is_dryrun: bool = True, workers: int = 0, preserve_metadata: str = PRESERVE_ALL, journal: ExecutionJournal = None, resume: bool = False, on_collision: str = ON_COLLISION_REPORT, check_existing: bool = False, batch_size: int = 100000):
+        """
+        Execute the (fpn, dst_fpn, action) rows of a csv, parquet or feather file (by extension),
+        reading only those columns, batch_size rows at a time, all rows planned together (see plan_actions)
+        """
+        _, batches = read_actions(filename, batch_size=batch_size)
+        _execute_batches(batches, callback_on_progress=self.callback_on_progress, journal=journal, callback_on_error=self.callback_on_error, is_dryrun=is_dryrun, workers=workers, preserve_metadata=preserve_metadata, resume=resume, on_collision=on_collision, check_existing=check_existing)
+        return self
+
+    @_operation
+    def load_from_file(self, filename: str):
+        """
+        Replace df with the content of a csv, parquet or feather file (by extension) saved by FiReMan
+        """
+        self.df = read_file(filename)
+        return self
+
+    @_operation
+    def save_to_csv(self, filename: str = "fireman.csv"):
+        self.full_df().to_csv(filename, index=False)
+        return self
+
+    @_operation
+    def save_to_parquet(self, filename: str = "fireman.parquet", compression: str = "zstd", row_group_size: int = 100000):
+        _require_pyarrow(FORMAT_PARQUET)
+        self.full_df().to_parquet(filename, index=False, compression=compression, row_group_size=row_group_size)
+        return self
+
+    @_operation
+    def save_to_feather(self, filename: str = "fireman.feather", compression: str = "zstd", chunksize: int = 100000):
+        _require_pyarrow(FORMAT_FEATHER)
+        self.full_df().reset_index(drop=True).to_feather(filename, compression=compression, chunksize=chunksize)
+        return self
+
+
+class FiReManStream:
+    """
+    Streaming variant of FiReMan, for trees too big to hold in one DataFrame.
+    scan_folder/scan_empty_folders/generate_output only register the pipeline, the rows are produced, transformed
+    and executed in DataFrames of chunk_size rows when execute/save_to_csv/iter_chunks pull them.
+    Memory stays bounded by chunk_size, except for the set of fpn kept to drop duplicates when scanning several paths,
+    and for the (src, dst) rows execute collects from all chunks to plan them together (see plan_actions).
+    The number of rows is not known upfront, callback_on_progress gets total = 0 while scanning (execute knows it).
+
+    FiReMan().stream(10000).scan_folder(src).generate_output(dst, True).execute(ACTION_COPY, is_dryrun=False)
+    """
+
+    def __init__(self, callback_on_error: callable = None, callback_on_progress: callable = None, chunk_size: int = 10000, progress_interval: float = 0.25, batch_errors: bool = False) -> None:
+        super().__init__()
+        self.progress = None
+        if progress_interval or batch_errors:
+            self.progress = ProgressThrottle(callback_on_progress, callback_on_error, interval=progress_interval, batch_errors=batch_errors)
+            callback_on_progress = self.progress.on_progress if callback_on_progress else None
+            callback_on_error = self.progress.on_error if callback_on_error else None
+        self.callback_on_error = callback_on_error
+        self.callback_on_progress = callback_on_progress
+        self.chunk_size = chunk_size
+        self.reset()
+
+    def reset(self):
+        self._sources = list()
+        self._stages = list()
+        return self
+
+    def _iter_rows(self) -> Iterator[tuple]:
+        if len(self._sources) == 1:
+            yield from self._sources[0]()
+            return
+
+        seen = set()
+        for source in self._sources:
+            for row in source():
+                if row[0] not in seen:
+                    seen.add(row[0])
+                    yield row
+
+    def iter_chunks(self) -> Iterator[pd.DataFrame]:
+        rows = self._iter_rows()
+        try:
+            while True:
+                chunk = list(islice(rows, self.chunk_size))
+                if not chunk:
+                    break
+
+                df = pd.DataFrame(chunk, columns=HEADER[:-2])
+                df[HEADER_TARGET_FPN] = ""
+                df[HEADER_ACTION] = ""
+                for stage in self._stages:
+                    stage(df)
+                yield df
+        finally:
+            if self.progress:
+                self.progress.flush()
+
+    def scan_folder(self, path: str,
+                    include_files: bool = True,
+                    include_folders: bool = False,
+                    include_sub_folders: bool = True,
+                    filename_regex_filter: str = "",
+                    workers: int = 0,
+                    cache: ScanCache = None,
+                    scan_filter: ScanFilter = None):
+        def _source():
+            entries = iter_entries(path, include_files=include_files, include_folders=include_folders, include_sub_folders=include_sub_folders, filename_regex_filter=filename_regex_filter, callback_on_error=self.callback_on_error, workers=workers, cache=cache, scan_filter=scan_filter)
+            return iter_file_details(entries, path, callback_on_error=self.callback_on_error, callback_on_progress=self.callback_on_progress, workers=workers)
+
+        self._sources.append(_source)
+        return self
+
+    def scan_empty_folders(self, path: str, workers: int = 0):
+        def _source():
+            return iter_file_details(list_empty_folders(path, workers=workers), path, callback_on_error=self.callback_on_error, callback_on_progress=self.callback_on_progress, workers=workers)
+
+        self._sources.append(_source)
+        return self
+
+    def generate_output(self,
+                        dst_folder: str,
+                        keep_source_folder_structure: bool,
+                        src_regex: str = "",
+                        dst_regex: str = "",
+                        on_collision: str = ON_COLLISION_REPORT):
+        # conflicts are only detected within each chunk
+        def _stage(df):
+            _generate_output(df, dst_folder, keep_source_folder_structure, src_regex, dst_regex, on_collision, self.callback_on_error)
+
+        self._stages.append(_stage)
         return self
 
-    def execute_from_csv(self, filename: str, is_dryrun: bool = True):
-        df = pd.read_csv(filename)
-        for col_name in CSV_HEADERS:
-            if col_name not in df.columns:
-                raise ValueError(f"Expected header of {filename} to have {CSV_HEADERS}. Missing {col_name}")
-        
-        exec_list = df[CSV_HEADERS].fillna("", inplace=False).values.tolist()
-        execute_actions(exec_list, callback_on_error=self.callback_on_error, callback_on_progress=self.callback_on_progress, is_dryrun=is_dryrun)
+    def execute(self, action: str, is_dryrun: bool = True, workers: int = 0, preserve_metadata: str = PRESERVE_ALL, journal: ExecutionJournal = None, resume: bool = False, on_collision: str = ON_COLLISION_REPORT, check_existing: bool = False):
+        if action not in ACTIONS:
+            raise ValueError(f"Action must be one of {ACTIONS}")
 
+        batches = (_df_list_based_on_action(df, action) for df in self.iter_chunks())
+        try:
+            _execute_batches(batches, callback_on_progress=self.callback_on_progress, journal=journal, action=action, callback_on_error=self.callback_on_error, is_dryrun=is_dryrun, workers=workers, preserve_metadata=preserve_metadata, resume=resume, on_collision=on_collision, check_existing=check_existing)
+        finally:
+            if self.progress:
+                self.progress.flush()
         return self
 
     def save_to_csv(self, filename: str = "fireman.csv"):
-        self.df.to_csv(filename, index=False)
+        header = True
+        for df in self.iter_chunks():
+            df.to_csv(filename, index=False, header=header, mode="w" if header else "a")
+            header = False
+
+        if header:
+            pd.DataFrame([], columns=HEADER).to_csv(filename, index=False)
+
         return self
+
+
+def _libc_inotify():
+    # inotify through ctypes (linux only), None when not available
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        libc.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+    except (OSError, AttributeError):
+        return None
+    return libc
+
+
+class FiReManWatch:
+    """
+    Watch mode: keeps a live index of the files under path, and applies a generate_output rule and an action to the
+    files arriving (or changing) there, in batches, without rescanning the tree.
+    Events come from inotify (linux, through ctypes), else from polling every poll_interval seconds, with the folder
+    listings reused from an in memory ScanCache (files changed in place are then only seen with inotify).
+    A file is handled once no event touched it for debounce seconds: with inotify after it was closed after writing
+    or moved in, with polling once its size/mtime did not change between two polls.
+    Files under dst_folder are never handled, so it may be inside path.
+    is_dryrun = like execute, True by default: only the callbacks are called, pass is_dryrun=False to act on the files
+    process_existing = also handle the files already there when the watch starts
+
+    watch = FiReManWatch(src, dst, True, ACTION_MOVE, src_regex=r"^(.+)\\.jpeg$", dst_regex=r"\\1.jpg", is_dryrun=False).start()
+    ...
+    watch.stop()
+    """
+    _IN_CLOSE_WRITE = 0x8
+    _IN_MOVED_FROM = 0x40
+    _IN_MOVED_TO = 0x80
+    _IN_CREATE = 0x100
+    _IN_DELETE = 0x200
+    _IN_Q_OVERFLOW = 0x4000
+    _IN_IGNORED = 0x8000
+    _IN_ONLYDIR = 0x1000000
+    _IN_ISDIR = 0x40000000
+    _IN_MASK = _IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO | _IN_CREATE | _IN_DELETE | _IN_ONLYDIR
+
+    def __init__(self, path: str,
+                 dst_folder: str,
+                 keep_source_folder_structure: bool,
+                 action: str,
+                 src_regex: str = "",
+                 dst_regex: str = "",
+                 filename_regex_filter: str = "",
+                 include_sub_folders: bool = True,
+                 scan_filter: ScanFilter = None,
+                 on_collision: str = ON_COLLISION_REPORT,
+                 is_dryrun: bool = True,
+                 preserve_metadata: str = PRESERVE_ALL,
+                 journal: ExecutionJournal = None,
+                 debounce: float = 0.05,
+                 batch_size: int = 1000,
+                 poll_interval: float = 1.0,
+                 use_inotify: bool = True,
+                 process_existing: bool = False,
+                 callback_on_error: callable = None,
+                 callback_on_progress: callable = None) -> None:
+        super().__init__()
+        if action not in ACTIONS:
+            raise ValueError(f"Action must be one of {ACTIONS}")
+        if action in (ACTION_MOVE_FOLDER, ACTION_REMOVE_FOLDER):
+            raise ValueError(f"Action must be one of the file actions, not {action}")
+        if on_collision not in ON_COLLISIONS:
+            raise ValueError(f"on_collision must be one of {ON_COLLISIONS}")
+
+        self.path = os.path.abspath(path)
+        self.dst_folder = dst_folder
+        self.keep_source_folder_structure = keep_source_folder_structure
+        self.action = action
+        self.src_regex = src_regex
+        self.dst_regex = dst_regex
+        self.regex = re.compile(filename_regex_filter) if filename_regex_filter else None
+        self.include_sub_folders = include_sub_folders
+        self.scan_filter = scan_filter
+        self.on_collision = on_collision
+        self.is_dryrun = is_dryrun
+        self.preserve_metadata = preserve_metadata
+        self.journal = journal
+        self.debounce = debounce
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.process_existing = process_existing
+        self.callback_on_error = callback_on_error
+        self.callback_on_progress = callback_on_progress
+
+        self.index = dict()         # fpn -> (size, mtime) of the files under path
+        self.pending = dict()       # fpn -> [time of its last event, (size, mtime) when polling]
+        self.handled = 0
+        self._libc = _libc_inotify() if use_inotify else None
+        self._fd = -1
+        self._watches = dict()      # inotify watch descriptor -> folder
+        self._dst_key = os.path.normcase(os.path.abspath(dst_folder)) + os.sep
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def uses_inotify(self) -> bool:
+        return self._fd >= 0
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def start(self):
+        """
+        run the watch on a background thread, until stop()
+        """
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run, name="FiReManWatch", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout: float = None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        return self
+
+    def run(self, duration: float = None):
+        """
+        watch on the calling thread, until stop() or for duration seconds
+        """
+        deadline = None if duration is None else time.monotonic() + duration
+        if self._libc is not None:
+            self._fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+
+        cache = None if self.uses_inotify else ScanCache(":memory:")
+        try:
+            self._index_folder(self.path, cache, new=self.process_existing)
+            while not self._stop.is_set() and (deadline is None or time.monotonic() < deadline):
+                if self.uses_inotify:
+                    self._read_events(self._wait_time(0.5 if deadline is None else min(0.5, max(0.0, deadline - time.monotonic()))))
+                else:
+                    self._stop.wait(self.poll_interval)
+                    self._poll(cache)
+                self._handle_ready()
+        finally:
+            if cache is not None:
+                cache.close()
+            if self.uses_inotify:
+                os.close(self._fd)
+                self._fd = -1
+                self._watches = dict()
+
+    def _wait_time(self, longest: float) -> float:
+        if not self.pending:
+            return longest
+        oldest = min(event_time for event_time, _ in self.pending.values())
+        return min(longest, max(0.0, oldest + self.debounce - time.monotonic()))
+
+    def _accepts(self, fpn: str) -> bool:
+        if os.path.normcase(fpn).startswith(self._dst_key):
+            return False
+        if not self.include_sub_folders and os.path.dirname(fpn) != self.path:
+            return False
+        return not self.regex or bool(self.regex.search(os.path.basename(fpn)))
+
+    def _folder_filter(self, folder: str) -> ScanFilter:
+        # scan_filter for a walk starting at folder, with max_depth still counted from path
+        scan_filter = self.scan_filter
+        if scan_filter and scan_filter.max_depth is not None and folder != self.path:
+            scan_filter = copy.copy(scan_filter)
+            scan_filter.max_depth -= folder[len(self.path):].count(os.sep)
+        return scan_filter
+
+    def _add_watch(self, folder: str):
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(folder), self._IN_MASK)
+        if wd < 0:
+            if self.callback_on_error:
+                error = ctypes.get_errno()
+                self.callback_on_error("WATCH", [folder, OSError(error, os.strerror(error), folder)])
+            return
+        self._watches[wd] = folder
+
+    def _index_folder(self, folder: str, cache: ScanCache = None, new: bool = True):
+        """
+        index the files of folder (and with inotify watch its sub-folders), as pending when new
+        """
+        scan_filter = self._folder_filter(folder)
+        if scan_filter and scan_filter.max_depth is not None and scan_filter.max_depth < 0:
+            return
+
+        if self.uses_inotify:
+            self._add_watch(folder)
+        now = time.monotonic()
+        for entry in iter_entries(folder, include_files=True, include_folders=self.uses_inotify, include_sub_folders=self.include_sub_folders, callback_on_error=self.callback_on_error, cache=cache, scan_filter=scan_filter):
+            if entry.is_dir():
+                if self.include_sub_folders:
+                    self._add_watch(entry.path)
+            elif self._accepts(entry.path):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                signature = (stat.st_size, stat.st_mtime)
+                if new:
+                    self.pending[entry.path] = [now, signature]
+                else:
+                    self.index[entry.path] = signature
+
+    def _forget(self, path: str, is_folder: bool = False):
+        self.index.pop(path, None)
+        self.pending.pop(path, None)
+        if is_folder:
+            prefix = path + os.sep
+            for fpn in [fpn for fpn in self.index if fpn.startswith(prefix)]:
+                del self.index[fpn]
+            for fpn in [fpn for fpn in self.pending if fpn.startswith(prefix)]:
+                del self.pending[fpn]
+            # a folder moved away keeps its watches, on its new path outside of ours
+            for wd, folder in list(self._watches.items()):
+                if folder == path or folder.startswith(prefix):
+                    self._libc.inotify_rm_watch(self._fd, wd)
+                    del self._watches[wd]
+
+    def _read_events(self, timeout: float):
+        ready = select.select([self._fd], [], [], timeout)[0]
+        if not ready:
+            return
+
+        try:
+            data = os.read(self._fd, 1 << 16)
+        except BlockingIOError:
+            return
+
+        now = time.monotonic()
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = struct.unpack_from("iIII", data, offset)
+            name = data[offset + 16:offset + 16 + length].split(b"\0", 1)[0]
+            offset += 16 + length
+
+            if mask & self._IN_Q_OVERFLOW:
+                # events were lost, compare the whole tree with the index once
+                self._resync()
+                continue
+            if mask & self._IN_IGNORED:
+                self._watches.pop(wd, None)
+                continue
+
+            folder = self._watches.get(wd)
+            if folder is None or not name:
+                continue
+            path = os.path.join(folder, os.fsdecode(name))
+
+            if mask & self._IN_ISDIR:
+                if mask & (self._IN_CREATE | self._IN_MOVED_TO):
+                    if self.include_sub_folders and not (self.scan_filter and self.scan_filter.is_excluded(_CachedEntry(folder, os.fsdecode(name), None, None, None, None))):
+                        self._index_folder(path)
+                elif mask & (self._IN_DELETE | self._IN_MOVED_FROM):
+                    self._forget(path, is_folder=True)
+            elif mask & (self._IN_CLOSE_WRITE | self._IN_MOVED_TO):
+                if self._accepts(path):
+                    self.pending[path] = [now, None]
+            elif mask & (self._IN_DELETE | self._IN_MOVED_FROM):
+                self._forget(path)
+
+    def _resync(self):
+        previous = self.index
+        self.index = dict()
+        self._index_folder(self.path, new=False)
+        now = time.monotonic()
+        for fpn, signature in self.index.items():
+            if previous.get(fpn) != signature:
+                self.pending[fpn] = [now, None]
+
+    def _poll(self, cache: ScanCache):
+        now = time.monotonic()
+        seen = set()
+        for entry in iter_entries(self.path, include_files=True, include_folders=False, include_sub_folders=self.include_sub_folders, callback_on_error=self.callback_on_error, cache=cache, scan_filter=self.scan_filter):
+            fpn = entry.path
+            if not self._accepts(fpn):
+                continue
+            seen.add(fpn)
+            if fpn in self.pending:
+                continue
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            signature = (stat.st_size, stat.st_mtime)
+            if self.index.get(fpn) != signature:
+                self.pending[fpn] = [now, signature]
+
+        # pending files are stat-ed again (the cached stat may be stale), until they stop changing
+        for fpn, pending in list(self.pending.items()):
+            try:
+                stat = os.stat(fpn)
+            except OSError:
+                del self.pending[fpn]
+                continue
+            signature = (stat.st_size, stat.st_mtime)
+            if signature == self.index.get(fpn):
+                del self.pending[fpn]
+            elif signature != pending[1]:
+                pending[0] = now
+                pending[1] = signature
+
+        for fpn in [fpn for fpn in self.index if fpn not in seen]:
+            del self.index[fpn]
+
+    def _handle_ready(self):
+        now = time.monotonic()
+        ready = [fpn for fpn, (event_time, _) in self.pending.items() if now - event_time >= self.debounce]
+        for start in range(0, len(ready), self.batch_size):
+            self._handle(ready[start:start + self.batch_size])
+
+    def _handle(self, fpns: List[str]):
+        """
+        generate_output and execute the action for a batch of files, like FiReMan does for a scan
+        """
+        signatures = {fpn: self.pending.pop(fpn)[1] for fpn in fpns}
+        rows = list()
+        for fpn in fpns:
+            try:
+                row = _file_details(fpn, fpn, len(self.path))
+            except FileNotFoundError:
+                # gone before being handled (ex: temporary file renamed)
+                continue
+            except Exception as e:
+                if self.callback_on_error:
+                    self.callback_on_error("WATCH", [fpn, e])
+                continue
+            if row[10] and (not self.scan_filter or self.scan_filter.is_file_accepted(_CachedEntry(row[1], row[4], S_IFREG, row[7], row[8].timestamp(), row[9].timestamp()))):
+                rows.append(row)
+                self.index[fpn] = signatures[fpn] or (row[7], row[8].timestamp())
+
+        if not rows:
+            return
+
+        df = pd.DataFrame(rows, columns=HEADER[:-2])
+        df[HEADER_TARGET_FPN] = ""
+        df[HEADER_ACTION] = ""
+        _generate_output(df, self.dst_folder, self.keep_source_folder_structure, self.src_regex, self.dst_regex, self.on_collision, self.callback_on_error)
+        execute_actions(_df_list_based_on_action(df, self.action), action=self.action, callback_on_error=self.callback_on_error, callback_on_progress=self.callback_on_progress, is_dryrun=self.is_dryrun, preserve_metadata=self.preserve_metadata, journal=self.journal)
+
+        if self.action != ACTION_COPY and not self.is_dryrun:
+            for row in rows:
+                self.index.pop(row[0], None)
+        self.handled += len(rows)
+
+
+class TableView:
+    """
+    Sorted/filtered view over rows appended incrementally (ex: while a scan runs), for virtual GUI tables that fetch
+    only the visible rows: the rows are never copied or re-inserted, sort and filter only rebuild an index array.
+    rows = tuples with the columns (ex: as yielded by iter_file_details), view[i] = i-th row shown
+    Rows appended to a sorted view go to its end, until sort() is called again.
+
+    view = TableView()
+    view.append(iter_file_details(iter_entries(path, include_folders=False, include_sub_folders=True), path))
+    view.sort("size", ascending=False).filter(".jpg")
+    visible = view.page(0, 100)
+    """
+
+    def __init__(self, columns: List[str] = None) -> None:
+        super().__init__()
+        self.columns = list(columns or HEADER[:-2])
+        self.rows = list()
+        self.sort_column = None
+        self.ascending = True
+        self.filter_text = ""
+        self.filter_column = REGEX_RENAME_BASED_ON_FIELD
+        self._order = list()
+        self._lowered = None
+        self.index = list()
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def __getitem__(self, item: int) -> tuple:
+        return self.rows[self.index[item]]
+
+    def _column(self, column) -> int:
+        return column if isinstance(column, int) else self.columns.index(column)
+
+    def _matches(self, positions: Iterable[int]) -> List[int]:
+        if not self.filter_text:
+            return list(positions)
+
+        # lowered text of the filter column, kept to filter again (ex: while typing) without converting each row
+        col = self._column(self.filter_column)
+        if self._lowered is None or self._lowered[0] != col:
+            self._lowered = (col, list())
+        lowered = self._lowered[1]
+        if len(lowered) < len(self.rows):
+            lowered.extend(str(row[col]).lower() for row in self.rows[len(lowered):])
+
+        needle = self.filter_text.lower()
+        return [i for i in positions if needle in lowered[i]]
+
+    def clear(self):
+        self.rows = list()
+        self._order = list()
+        self._lowered = None
+        self.index = list()
+        return self
+
+    def append(self, rows: Iterable[tuple]) -> int:
+        """
+        returns the number of new rows shown (passing the filter)
+        """
+        start = len(self.rows)
+        self.rows.extend(rows)
+        positions = range(start, len(self.rows))
+        self._order.extend(positions)
+        shown = self._matches(positions)
+        self.index.extend(shown)
+        return len(shown)
+
+    def sort(self, column=None, ascending: bool = True):
+        """
+        column = name or number, None to show the rows in the order they were appended
+        """
+        self.sort_column = column
+        self.ascending = ascending
+        if column is None:
+            self._order = list(range(len(self.rows)))
+        else:
+            col = self._column(column)
+            keys = [row[col] for row in self.rows]
+            self._order = sorted(range(len(keys)), key=keys.__getitem__, reverse=not ascending)
+        self.index = self._matches(self._order)
+        return self
+
+    def filter(self, text: str = "", column=None):
+        """
+        show only the rows whose column (default: filename) contains text, case insensitive ("" shows all)
+        """
+        self.filter_text = text
+        if column is not None:
+            self.filter_column = column
+        self.index = self._matches(self._order)
+        return self
+
+    def cell(self, item: int, column) -> str:
+        value = self.rows[self.index[item]][self._column(column)]
+        return "" if value is None else str(value)
+
+    def page(self, number: int, size: int) -> List[list]:
+        """
+        rows of page number (from 0) as lists of strings
+        """
+        return [["" if value is None else str(value) for value in self.rows[i]] for i in self.index[number * size:(number + 1) * size]]
+
+
+# kind "progress": data is the callback_on_progress data (throttled: with the ProgressThrottle stats dict appended,
+# unless progress_interval is 0), kind "error": data is the callback_on_error data of one error, whatever the interval
+FiReManEvent = namedtuple("FiReManEvent", ["kind", "sender", "data"])
+
+
+class OperationCancelled(Exception):
+    pass
+
+
+class AsyncOperation:
+    """
+    One AsyncFiReMan call, started when first awaited or iterated:
+    await op                    -> runs it, returns the AsyncFiReMan (or raises its exception)
+    async for event in op: ...  -> runs it streaming FiReManEvent("progress"|"error", sender, data), then await op for the result,
+                                   leaving the loop early (break, exception) cancels it
+    op.cancel()                 -> stops the worker at its next file/row (cancelling the awaiting task does the same),
+                                   rows already scanned are kept, and await op raises OperationCancelled
+    While iterating, the worker blocks once max_pending events are waiting, so a slow consumer slows the work down.
+    Progress events are throttled as in ProgressThrottle (AsyncFiReMan progress_interval, 0 for one per file),
+    error events never are: one event per error (see FiReManEvent).
+    """
+
+    def __init__(self, afrm, func: callable, *args, **kwargs):
+        self._afrm = afrm
+        self._call = partial(func, *args, **kwargs)
+        self._cancel = threading.Event()
+        self._loop = None
+        self._queue = None
+        self._future = None
+        self._task = None
+
+    def _start(self, stream: bool):
+        if self._task is None:
+            self._loop = asyncio.get_running_loop()
+            self._queue = asyncio.Queue(self._afrm.max_pending) if stream else None
+            self._future = self._afrm._submit(self)
+            self._task = asyncio.wrap_future(self._future)
+        return self
+
+    def _run(self):
+        throttle = ProgressThrottle(lambda sender, data: self.emit("progress", sender, data),
+                                    lambda sender, data: self.emit("error", sender, data),
+                                    interval=self._afrm.progress_interval, batch_errors=False)
+
+        # cancel is checked on every file, even when its progress event is throttled
+        def _on_progress(sender, data):
+            self.check_cancelled()
+            throttle.on_progress(sender, data)
+
+        def _on_error(sender, data):
+            self.check_cancelled()
+            throttle.on_error(sender, data)
+
+        self._afrm.frm.callback_on_progress = _on_progress if self._afrm.progress_interval else throttle.callback_on_progress
+        self._afrm.frm.callback_on_error = _on_error if self._afrm.progress_interval else throttle.callback_on_error
+        self._call()
+        throttle.flush()
+        return self._afrm
+
+    def check_cancelled(self):
+        if self._cancel.is_set():
+            raise OperationCancelled()
+
+    def emit(self, kind: str, sender: str, data):
+        """
+        called on the worker thread, blocks while the event queue is full
+        """
+        self.check_cancelled()
+        if self._queue is None:
+            return
+
+        future = asyncio.run_coroutine_threadsafe(self._queue.put(FiReManEvent(kind, sender, data)), self._loop)
+        while True:
+            try:
+                return future.result(timeout=0.1)
+            except FutureTimeoutError:
+                if self._cancel.is_set():
+                    future.cancel()
+                    raise OperationCancelled()
+
+    def cancel(self):
+        self._cancel.set()
+
+    async def _wait(self):
+        try:
+            return await asyncio.shield(self._task)
+        except asyncio.CancelledError:
+            self.cancel()
+            # not started yet (waiting for the worker): nothing to wait for
+            if self._future.cancel():
+                raise
+            # let the worker reach its next check, so the FiReMan is not used by 2 threads
+            await asyncio.wait({self._task})
+            if not self._task.cancelled():
+                self._task.exception()
+            raise
+
+    def __await__(self):
+        return self._start(stream=False)._wait().__await__()
+
+    async def __aiter__(self) -> AsyncIterator[FiReManEvent]:
+        self._start(stream=True)
+        try:
+            while True:
+                if not self._queue.empty():
+                    yield self._queue.get_nowait()
+                    continue
+                if self._task.done():
+                    return
+
+                getter = asyncio.ensure_future(self._queue.get())
+                try:
+                    await asyncio.wait({getter, self._task}, return_when=asyncio.FIRST_COMPLETED)
+                except asyncio.CancelledError:
+                    getter.cancel()
+                    raise
+
+                if getter.done():
+                    yield getter.result()
+                else:
+                    getter.cancel()
+        finally:
+            # the loop was left early (break, exception, cancelled): stop the worker, else it blocks on the full queue
+            if not self._task.done():
+                self.cancel()
+
+
+class AsyncFiReMan:
+    """
+    asyncio facade of FiReMan: every call runs on a single worker thread (the FiReMan state is not shared between
+    calls running at the same time), use workers= on scan/execute for concurrent filesystem access within a call.
+
+    afrm = AsyncFiReMan()
+    await afrm.scan_folder(src)
+    async for event in afrm.execute(ACTION_COPY, is_dryrun=False):
+        ...
+    """
+
+    def __init__(self, max_pending: int = 1000, compact: bool = False, progress_interval: float = 0.25, instrument: bool = False) -> None:
+        super().__init__()
+        self.max_pending = max_pending
+        self.progress_interval = progress_interval
+        self.frm = FiReMan(compact=compact, progress_interval=0, instrument=instrument)
+        self._executor = ThreadPoolExecutor(max_workers=1)
+
+    def _submit(self, operation: AsyncOperation):
+        return self._executor.submit(operation._run)
+
+    @property
+    def df(self) -> pd.DataFrame:
+        return self.frm.df
+
+    @property
+    def conflicts(self) -> pd.DataFrame:
+        return self.frm.conflicts
+
+    @property
+    def stats(self) -> Stats:
+        return self.frm.stats
+
+    def close(self):
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def reset(self):
+        self.frm.reset()
+        return self
+
+    def scan_folder(self, path: str,
+                    include_files: bool = True,
+                    include_folders: bool = False,
+                    include_sub_folders: bool = True,
+                    filename_regex_filter: str = "",
+                    workers: int = 0,
+                    cache: ScanCache = None,
+                    scan_filter: ScanFilter = None) -> AsyncOperation:
+        # checking for cancellation while the folders are listed too, no progress is reported then
+        operation = AsyncOperation(self, self.frm.scan_folder, path, include_files=include_files, include_folders=include_folders, include_sub_folders=include_sub_folders, filename_regex_filter=filename_regex_filter, workers=workers, cache=cache, scan_filter=scan_filter, check_cancelled=lambda: operation.check_cancelled())
+        return operation
+
+    def scan_folders(self, paths: Iterable[str], include_files: bool = True, include_folders: bool = False, include_sub_folders: bool = True, filename_regex_filter: str = "", processes: int = 0, workers: int = 0, scan_filter: ScanFilter = None) -> AsyncOperation:
+        return AsyncOperation(self, self.frm.scan_folders, paths, include_files=include_files, include_folders=include_folders, include_sub_folders=include_sub_folders, filename_regex_filter=filename_regex_filter, processes=processes, workers=workers, scan_filter=scan_filter)
+
+    def scan_empty_folders(self, path: str, workers: int = 0) -> AsyncOperation:
+        return AsyncOperation(self, self.frm.scan_empty_folders, path, workers=workers)
+
+    def generate_output(self, dst_folder: str, keep_source_folder_structure: bool, src_regex: str = "", dst_regex: str = "", on_collision: str = ON_COLLISION_REPORT) -> AsyncOperation:
+        return AsyncOperation(self, self.frm.generate_output, dst_folder, keep_source_folder_structure, src_regex=src_regex, dst_regex=dst_regex, on_collision=on_collision)
+
+    def find_duplicates(self, keep: str = "", workers: int = 4, partial_size: int = 4096) -> AsyncOperation:
+        return AsyncOperation(self, self.frm.find_duplicates, keep=keep, workers=workers, partial_size=partial_size)
+
+    def execute(self, action: str, is_dryrun: bool = True, workers: int = 0, preserve_metadata: str = PRESERVE_ALL, journal: ExecutionJournal = None, resume: bool = False, on_collision: str = ON_COLLISION_REPORT, check_existing: bool = False) -> AsyncOperation:
+        return AsyncOperation(self, self.frm.execute, action, is_dryrun=is_dryrun, workers=workers, preserve_metadata=preserve_metadata, journal=journal, resume=resume, on_collision=on_collision, check_existing=check_existing)
+
+    def execute_from_file(self, filename: str, is_dryrun: bool = True, workers: int = 0, preserve_metadata: str = PRESERVE_ALL, journal: ExecutionJournal = None, resume: bool = False, on_collision: str = ON_COLLISION_REPORT, check_existing: bool = False, batch_size: int = 100000) -> AsyncOperation:
+        return AsyncOperation(self, self.frm.execute_from_file, filename, is_dryrun=is_dryrun, workers=workers, preserve_metadata=preserve_metadata, journal=journal, resume=resume, on_collision=on_collision, check_existing=check_existing, batch_size=batch_size)
+
+    def save_to_csv(self, filename: str = "fireman.csv") -> AsyncOperation:
+        return AsyncOperation(self, self.frm.save_to_csv, filename)
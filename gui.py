@@ -1,41 +1,113 @@
 import wx
+import threading
 from os import getcwd
-from fireman import FiReMan, HEADER
+from fireman import TableView, iter_entries, iter_file_details
 
 
-class Mywin(wx.Frame):
+BATCH_SIZE = 5000
+COLUMN_WIDTHS = {"fpn": 400, "folder": 300, "rpath": 250, "rfolder": 200, "filename": 200, "name": 150, "ext": 50}
 
-   def __init__(self, parent, title):
-        super(Mywin, self).__init__(parent, size=wx.Size(1900, 600) , title = title)
 
-        panel = wx.Panel(self)
-        box = wx.BoxSizer(wx.HORIZONTAL)
+class VirtualFileList(wx.ListCtrl):
+    """
+    wx.LC_VIRTUAL list: wx only asks (OnGetItemText) for the rows on screen, sort/filter are done by the TableView
+    """
+
+    def __init__(self, parent, view: TableView):
+        super(VirtualFileList, self).__init__(parent, -1, style=wx.LC_REPORT | wx.LC_VIRTUAL)
+        self.view = view
+        self.checked = set()
+
+        self.InsertColumn(0, "INDEX", width=70)
+        for i, name in enumerate(view.columns):
+            self.InsertColumn(i + 1, name.upper(), width=COLUMN_WIDTHS.get(name, 130))
+        self.EnableCheckBoxes(True)
+
+        self.Bind(wx.EVT_LIST_COL_CLICK, self.on_column_click)
+        self.Bind(wx.EVT_LIST_ITEM_CHECKED, lambda event: self.checked.add(self.view.index[event.GetIndex()]))
+        self.Bind(wx.EVT_LIST_ITEM_UNCHECKED, lambda event: self.checked.discard(self.view.index[event.GetIndex()]))
+
+    def OnGetItemText(self, item, col):
+        if col == 0:
+            return str(self.view.index[item])
+        return self.view.cell(item, col - 1)
+
+    def OnGetItemIsChecked(self, item):
+        return self.view.index[item] in self.checked
+
+    def refresh(self):
+        self.SetItemCount(len(self.view))
+        self.Refresh()
+
+    def on_column_click(self, event):
+        # INDEX column back to scan order, same column again toggles ascending/descending
+        column = self.view.columns[event.GetColumn() - 1] if event.GetColumn() else None
+        ascending = not (column == self.view.sort_column and self.view.ascending)
+        self.view.sort(column, ascending)
+        self.refresh()
+
+
+class Mywin(wx.Frame):
 
-        self.list = wx.ListCtrl(panel, -1, style = wx.LC_REPORT)
-        for i, name in enumerate(["index"]+HEADER):
-            self.list.InsertColumn(i, name.upper(), width=10)
-        self.list.EnableCheckBoxes(True)
+    def __init__(self, parent, title, path: str, filename_regex_filter: str = ""):
+        super(Mywin, self).__init__(parent, size=wx.Size(1900, 600), title=title)
 
-        frm = FiReMan()
-        frm.scan_folder(getcwd(), filename_regex_filter=r".+\.jpg")
-        file_list = frm.df.sort_values(by=["folder", "filename"], ascending=False, inplace=False)
+        panel = wx.Panel(self)
+        box = wx.BoxSizer(wx.VERTICAL)
+        bar = wx.BoxSizer(wx.HORIZONTAL)
 
-        for idx, row in file_list.iterrows():
-            index = self.list.InsertItem(0, str(idx))
-            for i, col in enumerate(row[:-1]):
-                self.list.SetItem(index, i+1, str(col))
+        self.filter = wx.TextCtrl(panel, -1)
+        self.filter.SetHint("filter filename")
+        self.filter.Bind(wx.EVT_TEXT, self.on_filter)
+        self.status = wx.StaticText(panel, -1, "")
+        bar.Add(self.filter, 0, wx.ALL, 5)
+        bar.Add(self.status, 1, wx.ALL | wx.ALIGN_CENTER_VERTICAL, 5)
 
-        for i in range(self.list.GetColumnCount()):
-            self.list.SetColumnWidth(i, wx.LIST_AUTOSIZE)
+        self.view = TableView()
+        self.view.sort("fpn", ascending=False)
+        self.list = VirtualFileList(panel, self.view)
+        self.scanning = True
 
+        box.Add(bar, 0, wx.EXPAND)
         box.Add(self.list, 1, wx.ALL | wx.EXPAND)
         panel.SetSizer(box)
-        panel.Fit()
         self.Centre()
-
         self.Show(True)
 
+        threading.Thread(target=self.scan, args=(path, filename_regex_filter), daemon=True).start()
+
+    def scan(self, path: str, filename_regex_filter: str):
+        # runs on its own thread, the rows are handed to the gui thread in batches
+        batch = list()
+        entries = iter_entries(path, include_files=True, include_folders=False, include_sub_folders=True, filename_regex_filter=filename_regex_filter)
+        for row in iter_file_details(entries, path):
+            batch.append(row)
+            if len(batch) >= BATCH_SIZE:
+                wx.CallAfter(self.on_rows, batch)
+                batch = list()
+        wx.CallAfter(self.on_rows, batch, True)
+
+    def on_rows(self, rows: list, done: bool = False):
+        if not self:
+            return
+
+        self.view.append(rows)
+        if done:
+            self.scanning = False
+            # rows appended while scanning were added at the end of the sorted view
+            self.view.sort(self.view.sort_column, self.view.ascending)
+        self.list.refresh()
+        self.update_status()
+
+    def on_filter(self, event):
+        self.view.filter(self.filter.GetValue())
+        self.list.refresh()
+        self.update_status()
+
+    def update_status(self):
+        self.status.SetLabel(f"{len(self.view):,} of {len(self.view.rows):,} files" + (" (scanning...)" if self.scanning else ""))
+
+
 ex = wx.App()
-Mywin(None, 'FiReMan Demo')
+Mywin(None, 'FiReMan Demo', getcwd(), filename_regex_filter=r".+\.jpg")
 ex.MainLoop()
-
@@ -0,0 +1,138 @@
+import asyncio
+import os
+import re
+import pandas as pd
+import pytest
+import fireman as FRM
+
+
+def _make(folder, **files):
+    for name, content in files.items():
+        with open(os.path.join(folder, name), "w") as f:
+            f.write(content)
+
+
+def _contents(folder):
+    result = dict()
+    for name in sorted(os.listdir(folder)):
+        with open(os.path.join(folder, name)) as f:
+            result[name] = f.read()
+    return result
+
+
+def _rows(folder, pairs, action):
+    return [(os.path.join(folder, src), os.path.join(folder, dst), action) for src, dst in pairs]
+
+
+@pytest.mark.parametrize("action", [FRM.ACTION_MOVE, FRM.ACTION_COPY])
+@pytest.mark.parametrize("workers", [0, 4])
+def test_swap(tmp_path, action, workers):
+    _make(tmp_path, a="a", b="b")
+    FRM.execute_actions(_rows(tmp_path, [("a", "b"), ("b", "a")], action), is_dryrun=False, workers=workers)
+    assert _contents(tmp_path) == {"a": "b", "b": "a"}
+
+
+@pytest.mark.parametrize("action", [FRM.ACTION_MOVE, FRM.ACTION_COPY])
+def test_ring(tmp_path, action):
+    _make(tmp_path, a="a", b="b", c="c")
+    FRM.execute_actions(_rows(tmp_path, [("a", "b"), ("b", "c"), ("c", "a")], action), is_dryrun=False)
+    assert _contents(tmp_path) == {"a": "c", "b": "a", "c": "b"}
+
+
+def test_chain_reads_before_overwrite(tmp_path):
+    _make(tmp_path, a="a", b="b")
+    FRM.execute_actions(_rows(tmp_path, [("a", "b"), ("b", "c")], FRM.ACTION_COPY), is_dryrun=False)
+    assert _contents(tmp_path) == {"a": "a", "b": "a", "c": "b"}
+
+
+def test_chain_through_a_new_path(tmp_path):
+    _make(tmp_path, x="x")
+    FRM.execute_actions(_rows(tmp_path, [("x", "y"), ("y", "z")], FRM.ACTION_MOVE), is_dryrun=False)
+    assert _contents(tmp_path) == {"z": "x"}
+
+
+def test_collision_reported(tmp_path):
+    _make(tmp_path, a="a", b="b")
+    errors = list()
+    FRM.execute_actions(_rows(tmp_path, [("a", "c"), ("b", "c")], FRM.ACTION_COPY), is_dryrun=False, callback_on_error=lambda sender, data: errors.append(data))
+    assert [str(data[3]) for data in errors] == ["destination collision"] * 2
+
+    with pytest.raises(ValueError):
+        FRM.execute_actions(_rows(tmp_path, [("a", "d"), ("b", "d")], FRM.ACTION_COPY), is_dryrun=False, on_collision=FRM.ON_COLLISION_RAISE)
+    assert not os.path.exists(os.path.join(tmp_path, "d"))
+
+
+def test_execute_from_file_swap_across_batches(tmp_path):
+    src = tmp_path / "src"
+    src.mkdir()
+    _make(src, a="a", b="b")
+    actions = tmp_path / "actions.csv"
+    pd.DataFrame(_rows(src, [("a", "b"), ("b", "a")], FRM.ACTION_MOVE), columns=FRM.CSV_HEADERS).to_csv(actions, index=False)
+
+    errors = list()
+    FRM.FiReMan(callback_on_error=lambda sender, data: errors.append(data)).execute_from_file(str(actions), is_dryrun=False, batch_size=1)
+    assert _contents(src) == {"a": "b", "b": "a"}
+    assert errors == []
+
+
+def test_async_for_break_cancels(tmp_path):
+    for i in range(500):
+        _make(tmp_path, **{f"{i}.txt": "x"})
+
+    async def _main():
+        afrm = FRM.AsyncFiReMan(max_pending=2, progress_interval=0)
+        operation = afrm.scan_folder(str(tmp_path))
+        async for _ in operation:
+            break
+        with pytest.raises(FRM.OperationCancelled):
+            await asyncio.wait_for(operation, 5)
+
+        # the worker is free again
+        await asyncio.wait_for(afrm.reset().scan_folder(str(tmp_path)), 5)
+        afrm.close()
+        return len(afrm.df)
+
+    assert asyncio.run(_main()) == 500
+
+
+@pytest.mark.parametrize("pattern, replacement", [
+    (r"^(.+)\.jpe?g$", r"\1.jpg"), (r"(\w+)\.(\w+)$", r"\2_\1"), (r"(\d)", r"<\1>"), (r"\s", "_"), (r"\bx", "X"),
+    (r"é", "e"), (r"([^.]+)\.(.*)", r"\2.\1"), (r"(?i)JPE?G", "jpg"), (r"(\.[a-z]+)", r"\0"), (r"[\d]+", "#"),
+    (r"a{,2}b", "Z"), (r"[[:alpha:]]+", "Z"), (r"[a-zß]{2,}", "Z"), (r"(.)(.)(.)(.)(.)(.)(.)(.)(.)(.)", r"\10"),
+    (r"txt$", "md"), (r"(?:na|ca)(.)", r"\1"), (r"x*?y", "-"),
+])
+@pytest.mark.filterwarnings("ignore:Possible nested set:FutureWarning")
+def test_regex_replace_matches_python_re(pattern, replacement):
+    names = pd.Series(["café.jpg", "naïve_1.JPG", "日本語 2.png", "x y.txt", "aab.txt", "ß3.tar.gz", "Ünï-çødé_42.jpeg", "line\n.txt"])
+    regex = re.compile(pattern)
+    assert FRM._regex_replace(names, regex, replacement).tolist() == [regex.sub(replacement, name) for name in names]
+    assert FRM._regex_replace(names[:-1], regex, replacement).tolist() == [regex.sub(replacement, name) for name in names[:-1]]
+
+
+def test_generate_output_reports_only_collisions(tmp_path):
+    _make(tmp_path, **{"a.txt": "a", "aa.txt": "aa"})
+    errors = list()
+    frm = FRM.FiReMan(callback_on_error=lambda sender, data: errors.append(data)).scan_folder(str(tmp_path))
+    frm.generate_output(str(tmp_path), True, src_regex=r"^a", dst_regex="aa", on_collision=FRM.ON_COLLISION_RAISE)
+    assert errors == [] and frm.conflicts[FRM.HEADER_CONFLICT].tolist() == [FRM.CONFLICT_CHAIN]
+
+    frm.execute(FRM.ACTION_RENAME, is_dryrun=False)
+    assert _contents(tmp_path) == {"aa.txt": "a", "aaa.txt": "aa"}
+
+    frm = FRM.FiReMan(callback_on_error=lambda sender, data: errors.append(data)).scan_folder(str(tmp_path))
+    frm.generate_output(str(tmp_path), True, src_regex=r"^a+", dst_regex="b")
+    assert sorted(str(data[2]) for data in errors) == ["destination collision"] * 2
+    with pytest.raises(ValueError):
+        frm.generate_output(str(tmp_path), True, src_regex=r"^a+", dst_regex="b", on_collision=FRM.ON_COLLISION_RAISE)
+
+
+def test_read_actions_total(tmp_path):
+    actions = tmp_path / "actions.csv"
+    rows = [("a\nb", "c", FRM.ACTION_COPY)] + [(f"{i}", f"{i}.bak", FRM.ACTION_COPY) for i in range(9)]
+    pd.DataFrame(rows, columns=FRM.CSV_HEADERS).to_csv(actions, index=False)
+    total, batches = FRM.read_actions(str(actions), batch_size=4)
+    assert total == 10 and [len(batch) for batch in batches] == [4, 4, 2]
+
+    progress = list()
+    FRM.FiReMan(callback_on_progress=lambda sender, data: progress.append(data[:2]), progress_interval=0).execute_from_csv(str(actions))
+    assert progress[0] == [10, 1] and progress[-1] == [10, 10]